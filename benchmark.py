@@ -0,0 +1,168 @@
+"""
+Benchmarks for the market-data hot path.
+
+Drives each stage of the pipeline with synthetic chains and with the events
+replayed from combined_data.json, and reports throughput, per-call latency
+percentiles and peak traced memory. Runs headless (Qt offscreen).
+
+    python benchmark.py
+    python benchmark.py --sizes 500 5000 --repeat 3 --json bench.json
+"""
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+from tastytrade.dxfeed import Greeks, Quote
+
+from ivHistory import DEFAULT_SAMPLE_INTERVAL, IVHistoryStore
+from main import TastyTraderAPI, reformat_model
+from marketData import OptionChainState
+from replayFeed import load_recording
+from trade_assister import calculate_iv_rank
+
+DEFAULT_SIZES = [500, 5000, 50000]
+
+
+def synthetic_chain(size: int, seed: int = 0):
+    """
+    Builds `size` option contracts plus one Greeks and one Quote event per contract.
+    """
+    rng = np.random.default_rng(seed)
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=6)
+    strikes = 5000 + 5 * (np.arange(size) // 2)
+    options, greeks, quotes = [], [], []
+    for i in range(size):
+        option_type = "C" if i % 2 == 0 else "P"
+        streamer_symbol = f".SPXW250410{option_type}{strikes[i]}"
+        options.append(SimpleNamespace(
+            symbol=f"SPXW  250410{option_type}{strikes[i]:05d}000", streamer_symbol=streamer_symbol,
+            strike_price=float(strikes[i]), option_type=option_type, expires_at=expires_at,
+        ))
+        delta, gamma, theta, vega, rho, vol = rng.random(6)
+        greeks.append(Greeks.model_construct(
+            event_symbol=streamer_symbol, event_time=0, event_flags=0, index=0,
+            time=int(time.time() * 1000), sequence=0, price=rng.random() * 50,
+            volatility=vol, delta=delta, gamma=gamma, theta=-theta, vega=vega, rho=rho,
+        ))
+        bid = rng.random() * 50
+        quotes.append(Quote.model_construct(
+            event_symbol=streamer_symbol, event_time=0, bid_price=bid, ask_price=bid + 0.1,
+        ))
+    return options, greeks, quotes
+
+
+def measure(name: str, calls: List[Callable[[], Any]], events_per_call: int = 1) -> Dict[str, Any]:
+    """
+    Times each call individually, then runs the calls again under tracemalloc for the
+    peak memory, so tracing overhead never shows up in the latencies.
+    :return: throughput, latency percentiles (microseconds) and peak memory for the stage.
+    """
+    latencies = np.empty(len(calls))
+    start = time.perf_counter()
+    for i, call in enumerate(calls):
+        t0 = time.perf_counter_ns()
+        call()
+        latencies[i] = time.perf_counter_ns() - t0
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    for call in calls:
+        call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) / 1000
+    return {
+        "stage": name,
+        "calls": len(calls),
+        "events_per_sec": len(calls) * events_per_call / elapsed if elapsed else float("inf"),
+        "p50_us": p50, "p95_us": p95, "p99_us": p99, "max_us": latencies.max() / 1000,
+        "peak_mb": peak / 2 ** 20,
+    }
+
+
+def bench_chain(label: str, options, greeks, quotes, window, repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    events = [event for pair in zip(greeks, quotes) for event in pair]
+
+    results.append(measure("reformat_model", [lambda g=g: reformat_model(g.__dict__) for g in greeks]))
+
+    state = OptionChainState(options)
+    results.append(measure("store_update", [
+        (lambda e=e: state.update_greeks(e)) if isinstance(e, Greeks) else (lambda e=e: state.update_quote(e))
+        for e in events
+    ]))
+
+    results.append(measure("display_columns", [state.display_columns] * repeat, len(options)))
+
+    results.append(measure("populate_table", [lambda: window.populate_table(state)] * repeat, len(options)))
+
+    rows = np.arange(state.size)
+    for column in ("bid", "delta"):
+        state.columns[column][:state.size] += 1
+    results.append(measure(
+        "refresh_rows", [lambda: window.market_data_model.refresh_rows(rows)] * repeat, len(options)
+    ))
+
+    iv_history = list(np.random.default_rng(1).random(252))
+    results.append(measure("calculate_iv_rank", [
+        lambda iv=iv: calculate_iv_rank(iv, iv_history) for iv in state.column("iv")
+    ]))
+
+    rolling = IVHistoryStore(sample_interval=0)
+    for iv in iv_history:
+        for symbol in state.streamer_symbols:
+            rolling.record(symbol, iv)
+    # steady state: most refreshes fall inside the sample interval and only query
+    rolling.sample_interval = DEFAULT_SAMPLE_INTERVAL
+    results.append(measure("iv_history_update", [lambda: rolling.update_rows(state)] * repeat, len(options)))
+
+    for result in results:
+        result["chain"] = label
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    header = f"{'chain':>14} {'stage':>20} {'calls':>7} {'events/s':>12} {'p50us':>9} {'p95us':>9} {'p99us':>9} {'peakMB':>8}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['chain']:>14} {r['stage']:>20} {r['calls']:>7} {r['events_per_sec']:>12,.0f} "
+              f"{r['p50_us']:>9.1f} {r['p95_us']:>9.1f} {r['p99_us']:>9.1f} {r['peak_mb']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the market-data pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="synthetic chain sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions of the whole-chain stages")
+    parser.add_argument("--replay", default="combined_data.json", help="recording to replay ('' to skip)")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    window = TastyTraderAPI()
+
+    results = []
+    if args.replay:
+        options, events = load_recording(args.replay)
+        greeks = [e for _, e in events if isinstance(e, Greeks)]
+        quotes = [e for _, e in events if isinstance(e, Quote)]
+        results += bench_chain(f"replay:{len(options)}", options, greeks, quotes, window, args.repeat)
+    for size in args.sizes:
+        results += bench_chain(f"synthetic:{size}", *synthetic_chain(size), window, args.repeat)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,12 @@
+import os
+import time
+
+import numpy as np
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
+from PySide6.QtCore import QTimer
+
+from metrics import metrics
 
 class ProfitLossCanvas(FigureCanvas):
     def __init__(self, parent=None):
@@ -8,14 +15,135 @@ class ProfitLossCanvas(FigureCanvas):
         super().__init__(fig)
         self.setParent(parent)
 
-    def plot_profit_loss(self, strikes, profits):
-        self.ax.clear()
-        self.ax.plot(strikes, profits, label='P/L')
+        # live mode: persistent artists blitted over a cached background
+        self.frame_budget = 1.0 / float(os.getenv("PNL_MAX_FPS", "30"))
+        self.last_frame_ms = 0.0
+        self._live = False
+        self._background = None
+        self._theoretical_line = None
+        self._spot_line = None
+        self._pending = None
+        self._last_frame = 0.0
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._render_frame)
+        self.mpl_connect('draw_event', self._capture_background)
+
+    def _decorate(self):
         self.ax.set_title('Profit/Loss Chart')
         self.ax.set_xlabel('Underlying Price')
         self.ax.set_ylabel('Profit/Loss')
         self.ax.legend()
-        self.draw()
         self.ax.grid(True)
-    
-    
\ No newline at end of file
+
+    def plot_profit_loss(self, strikes, profits, theoretical=None):
+        self._stop_live()
+        self.ax.clear()
+        self.ax.plot(strikes, profits, label='P/L')
+        if theoretical is not None:
+            self.ax.plot(strikes, theoretical, label='P/L (T+0)', linestyle='--')
+        self._decorate()
+        self.draw()
+
+    def start_live(self, prices, profits, theoretical, spot=None):
+        """
+        Draws the chart once and switches to live mode, where update_live only
+        repaints the T+0 curve and the spot marker on top of a cached background.
+        :param prices: underlying price grid shared by every later update.
+        :param profits: expiry P/L, drawn once as part of the background.
+        """
+        self._stop_live()
+        self.ax.clear()
+        self.ax.plot(prices, profits, label='P/L')
+        self._theoretical_line, = self.ax.plot(
+            prices, theoretical, label='P/L (T+0)', linestyle='--', animated=True
+        )
+        self._spot_line = self.ax.axvline(
+            np.nan if spot is None else spot, color='gray', linewidth=1, animated=True
+        )
+        self._decorate()
+        self._fit_ylim(profits, theoretical)
+        self._live = True
+        self.draw()
+
+    def update_live(self, theoretical=None, spot=None):
+        """
+        Queues new T+0 P/L values and/or spot price. Updates arriving faster than the
+        frame budget are coalesced, and the repaint runs from the event loop rather than
+        the caller, so this is cheap enough to call on every tick.
+        """
+        if not self._live:
+            return
+        pending = self._pending or {}
+        if theoretical is not None:
+            pending['theoretical'] = theoretical
+        if spot is not None:
+            pending['spot'] = spot
+        self._pending = pending
+        if not self._frame_timer.isActive():
+            wait = self.frame_budget - (time.perf_counter() - self._last_frame)
+            self._frame_timer.start(max(0, int(wait * 1000)))
+
+    def _stop_live(self):
+        self._live = False
+        self._pending = None
+        self._background = None
+        self._frame_timer.stop()
+
+    def _fit_ylim(self, *curves):
+        values = np.concatenate([np.asarray(curve, dtype=float) for curve in curves])
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        low, high = values.min(), values.max()
+        margin = max(high - low, 1.0) * 0.1
+        self.ax.set_ylim(low - margin, high + margin)
+
+    def _capture_background(self, event):
+        if not self._live:
+            return
+        self._background = self.copy_from_bbox(self.ax.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self._theoretical_line)
+        self.ax.draw_artist(self._spot_line)
+
+    def _render_frame(self):
+        pending, self._pending = self._pending, None
+        if not self._live or not pending:
+            return
+        start = time.perf_counter()
+        if 'theoretical' in pending:
+            self._theoretical_line.set_ydata(pending['theoretical'])
+        if 'spot' in pending:
+            self._spot_line.set_xdata([pending['spot'], pending['spot']])
+        if not self.isVisible():
+            # picked up by the full draw when the tab is shown again
+            self._background = None
+        elif self._background is None or self._out_of_view(pending.get('theoretical')):
+            # axes limits change, so the background has to be redrawn once
+            if 'theoretical' in pending:
+                self._fit_ylim(self._theoretical_line.get_ydata(), self.ax.lines[0].get_ydata())
+            self.draw()
+        else:
+            self.restore_region(self._background)
+            self._draw_animated()
+            self.blit(self.ax.bbox)
+        self._last_frame = time.perf_counter()
+        self.last_frame_ms = (self._last_frame - start) * 1000
+        if metrics.enabled:
+            metrics.observe("chart_frame", self._last_frame - start)
+
+    def _out_of_view(self, values):
+        if values is None:
+            return False
+        low, high = self.ax.get_ylim()
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        return bool(len(values)) and (values.min() < low or values.max() > high)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._live and self._background is None:
+            self.draw_idle()
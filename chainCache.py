@@ -0,0 +1,93 @@
+import os
+import pickle
+import time
+import zlib
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tastytrade", "chains")
+DEFAULT_TTL = 6 * 3600
+CACHE_VERSION = 1
+
+
+def cache_dir() -> str:
+    return os.getenv("CHAIN_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+
+def cache_path(symbol: str, trading_date: date, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or cache_dir(), f"{symbol}_{trading_date.isoformat()}.chain")
+
+
+def save_chain(symbol: str, trading_date: date, chain: Dict[date, List[Any]],
+               directory: Optional[str] = None) -> str:
+    """
+    Writes an option chain (as returned by get_option_chain) to the cache as a
+    zlib-compressed pickle, and drops cache files of earlier trading dates.
+    :return: path of the cache file.
+    """
+    directory = directory or cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = cache_path(symbol, trading_date, directory)
+    payload = {
+        "version": CACHE_VERSION,
+        "symbol": symbol,
+        "trading_date": trading_date,
+        "saved_at": time.time(),
+        "chain": dict(chain),
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)))
+    os.replace(tmp_path, path)
+    prune_chains(symbol, trading_date, directory)
+    return path
+
+
+def load_chain(symbol: str, trading_date: date, ttl: float = DEFAULT_TTL,
+               directory: Optional[str] = None) -> Optional[Dict[date, List[Any]]]:
+    """
+    Reads a cached option chain for the trading date.
+    :param ttl: maximum age in seconds before the cache is considered stale.
+    :return: the chain, or None if there is no usable cache entry.
+    """
+    path = cache_path(symbol, trading_date, directory)
+    try:
+        with open(path, "rb") as file:
+            payload = pickle.loads(zlib.decompress(file.read()))
+    except FileNotFoundError:
+        return None
+    except (OSError, zlib.error, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+        print(f"[DEBUG] Ignoring unreadable chain cache {path}: {e}")
+        return None
+    if payload.get("version") != CACHE_VERSION or payload.get("trading_date") != trading_date:
+        return None
+    if time.time() - payload.get("saved_at", 0) > ttl:
+        return None
+    return payload["chain"]
+
+
+def prune_chains(symbol: str, trading_date: date, directory: Optional[str] = None) -> None:
+    """
+    Removes cached chains of a symbol for trading dates before trading_date; expired
+    contracts roll off the chain every day.
+    """
+    directory = directory or cache_dir()
+    prefix = f"{symbol}_"
+    for name in os.listdir(directory):
+        if not (name.startswith(prefix) and name.endswith(".chain")):
+            continue
+        cached_date = name[len(prefix):-len(".chain")]
+        if cached_date < trading_date.isoformat():
+            os.remove(os.path.join(directory, name))
+
+
+def diff_options(cached: List[Any], fresh: List[Any]) -> Tuple[List[Any], List[str]]:
+    """
+    :return: options in fresh that are not in cached, and streamer symbols of cached
+        options that are no longer listed.
+    """
+    cached_symbols = {option.streamer_symbol for option in cached}
+    fresh_symbols = {option.streamer_symbol for option in fresh}
+    added = [option for option in fresh if option.streamer_symbol not in cached_symbols]
+    removed = [symbol for symbol in cached_symbols if symbol not in fresh_symbols]
+    return added, removed
@@ -0,0 +1,190 @@
+"""
+Vectorized Black-Scholes pricing, Greeks and implied volatility for European options.
+
+Every function takes NumPy arrays (or scalars) and broadcasts, so a whole chain is
+priced in one call. Greeks follow the dxfeed conventions used by the Greeks events:
+theta per calendar day, vega and rho per one volatility / rate percentage point.
+"""
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from scipy.special import ndtr
+
+from marketData import OptionChainState
+
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+# Floor for time-to-expiry so 0DTE contracts stay defined right up to the close
+MIN_TIME_TO_EXPIRY = 60.0 / SECONDS_PER_YEAR
+MIN_VOL = 1e-4
+MAX_VOL = 10.0
+
+
+def _npdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def _d1_d2(spot, strike, t, rate, div_yield, sigma):
+    sqrt_t = np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate - div_yield + 0.5 * sigma * sigma) * t) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t
+
+
+def black_scholes_price(spot, strike, t, sigma, is_call, rate=0.0, div_yield=0.0) -> np.ndarray:
+    """
+    :param spot: underlying price.
+    :param strike: option strike.
+    :param t: time to expiry in years.
+    :param sigma: volatility (0.2 for 20%).
+    :param is_call: True for calls, False for puts.
+    :return: theoretical option prices.
+    """
+    d1, d2 = _d1_d2(spot, strike, t, rate, div_yield, sigma)
+    spot_df = spot * np.exp(-div_yield * t)
+    strike_df = strike * np.exp(-rate * t)
+    call = spot_df * ndtr(d1) - strike_df * ndtr(d2)
+    put = strike_df * ndtr(-d2) - spot_df * ndtr(-d1)
+    return np.where(is_call, call, put)
+
+
+def black_scholes_greeks(spot, strike, t, sigma, is_call, rate=0.0, div_yield=0.0) -> Dict[str, np.ndarray]:
+    """
+    :return: price, delta, gamma, theta (per day), vega and rho (per 1%) arrays.
+    """
+    d1, d2 = _d1_d2(spot, strike, t, rate, div_yield, sigma)
+    sqrt_t = np.sqrt(t)
+    q_df = np.exp(-div_yield * t)
+    r_df = np.exp(-rate * t)
+    pdf_d1 = _npdf(d1)
+    nd1, nd2 = ndtr(d1), ndtr(d2)
+    n_minus_d1, n_minus_d2 = ndtr(-d1), ndtr(-d2)
+
+    price = np.where(is_call, spot * q_df * nd1 - strike * r_df * nd2,
+                     strike * r_df * n_minus_d2 - spot * q_df * n_minus_d1)
+    delta = np.where(is_call, q_df * nd1, -q_df * n_minus_d1)
+    gamma = q_df * pdf_d1 / (spot * sigma * sqrt_t)
+    decay = -spot * q_df * pdf_d1 * sigma / (2.0 * sqrt_t)
+    theta = np.where(
+        is_call,
+        decay - rate * strike * r_df * nd2 + div_yield * spot * q_df * nd1,
+        decay + rate * strike * r_df * n_minus_d2 - div_yield * spot * q_df * n_minus_d1,
+    ) / 365.0
+    vega = spot * q_df * pdf_d1 * sqrt_t / 100.0
+    rho = np.where(is_call, strike * t * r_df * nd2, -strike * t * r_df * n_minus_d2) / 100.0
+    return {"price": price, "delta": delta, "gamma": gamma, "theta": theta, "vega": vega, "rho": rho}
+
+
+def implied_volatility(price, spot, strike, t, is_call, rate=0.0, div_yield=0.0,
+                       tol: float = 1e-6, max_iter: int = 50) -> np.ndarray:
+    """
+    Solves for implied volatility across a whole chain at once with a safeguarded Newton
+    iteration: each contract keeps a [low, high] bracket and falls back to bisection when
+    a Newton step leaves it or vega is too small to trust.
+    :return: implied volatilities, NaN where the price is outside the no-arbitrage bounds
+        or no volatility in [MIN_VOL, MAX_VOL] reproduces it within tol.
+    """
+    price, spot, strike, t, is_call = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (price, spot, strike, t)), np.asarray(is_call, dtype=bool)
+    )
+    spot_df = spot * np.exp(-div_yield * t)
+    strike_df = strike * np.exp(-rate * t)
+    lower = np.where(is_call, np.maximum(spot_df - strike_df, 0.0), np.maximum(strike_df - spot_df, 0.0))
+    upper = np.where(is_call, spot_df, strike_df)
+    with np.errstate(invalid="ignore"):
+        valid = (t > 0) & (price > lower) & (price < upper) & np.isfinite(price) & (spot > 0)
+
+    sigma = np.full(price.shape, np.nan)
+    if not valid.any():
+        return sigma
+    p, s, k, tt, c = price[valid], spot[valid], strike[valid], t[valid], is_call[valid]
+    low = np.full(p.shape, MIN_VOL)
+    high = np.full(p.shape, MAX_VOL)
+    # Brenner-Subrahmanyam starting point, clipped into the bracket
+    guess = np.clip(np.sqrt(2.0 * np.pi / tt) * p / s, 0.05, 3.0)
+    # Only contracts that have not converged yet are iterated on
+    active = np.arange(len(p))
+    for _ in range(max_iter):
+        s_a, k_a, t_a, c_a, g_a = s[active], k[active], tt[active], c[active], guess[active]
+        d1, _d2 = _d1_d2(s_a, k_a, t_a, rate, div_yield, g_a)
+        diff = black_scholes_price(s_a, k_a, t_a, g_a, c_a, rate, div_yield) - p[active]
+        pending = np.abs(diff) >= tol
+        active, diff, d1 = active[pending], diff[pending], d1[pending]
+        if not len(active):
+            break
+        s_a, t_a, g_a = s[active], tt[active], guess[active]
+        high[active] = np.where(diff > 0, g_a, high[active])
+        low[active] = np.where(diff < 0, g_a, low[active])
+        vega = s_a * np.exp(-div_yield * t_a) * _npdf(d1) * np.sqrt(t_a)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = g_a - diff / vega
+        use_newton = (vega > 1e-8) & (newton > low[active]) & (newton < high[active])
+        guess[active] = np.where(use_newton, newton, 0.5 * (low[active] + high[active]))
+    # a contract that never converged is stuck at a bracket edge (e.g. priced above
+    # BS(MAX_VOL)); that edge is not its implied volatility
+    with np.errstate(invalid="ignore"):
+        converged = np.abs(black_scholes_price(s, k, tt, guess, c, rate, div_yield) - p) < tol
+    sigma[valid] = np.where(converged, guess, np.nan)
+    return sigma
+
+
+def time_to_expiry(expiry, now: Optional[float] = None) -> np.ndarray:
+    """
+    :param expiry: expiration timestamps in epoch seconds.
+    :return: years to expiry, floored at MIN_TIME_TO_EXPIRY.
+    """
+    now = time.time() if now is None else now
+    return np.maximum((np.asarray(expiry, dtype=float) - now) / SECONDS_PER_YEAR, MIN_TIME_TO_EXPIRY)
+
+
+def implied_underlying(state: OptionChainState) -> float:
+    """
+    Estimates the underlying price from put-call parity at the strike where the call and
+    put mids are closest (S ~ K + C - P). Used when no underlying quote is available.
+    :return: the estimate, NaN if no strike has both a call and a put quote.
+    """
+    rows = state.listed_rows()
+    strike = state.columns["strike"][rows]
+    mid = 0.5 * (state.columns["bid"][rows] + state.columns["ask"][rows])
+    is_call = state.is_call[rows]
+    calls = dict(zip(strike[is_call], mid[is_call]))
+    best, best_gap = np.nan, np.inf
+    for k, put_mid in zip(strike[~is_call], mid[~is_call]):
+        call_mid = calls.get(k)
+        if call_mid is None or np.isnan(call_mid) or np.isnan(put_mid):
+            continue
+        gap = abs(call_mid - put_mid)
+        if gap < best_gap:
+            best, best_gap = k + call_mid - put_mid, gap
+    return float(best)
+
+
+def update_model_greeks(state: OptionChainState, rows=None, rate: float = 0.0, div_yield: float = 0.0,
+                        now: Optional[float] = None) -> np.ndarray:
+    """
+    Recomputes implied volatility and Greeks from the quote mids for the given rows in one
+    batched call and writes them to the store's model_* columns.
+    :param rows: store rows to recompute; defaults to every listed row.
+    :return: the rows that were recomputed.
+    """
+    if rows is None:
+        rows = state.listed_rows()
+    rows = np.asarray(rows, dtype=np.intp)
+    rows = rows[state.listed[rows]]
+    if not len(rows):
+        return rows
+    spot = state.underlying_price()
+    if np.isnan(spot):
+        spot = implied_underlying(state)
+    columns = state.columns
+    mid = 0.5 * (columns["bid"][rows] + columns["ask"][rows])
+    strike = columns["strike"][rows]
+    is_call = state.is_call[rows]
+    t = time_to_expiry(columns["expiry"][rows], now)
+    iv = implied_volatility(mid, spot, strike, t, is_call, rate, div_yield)
+    # Contracts without a solvable IV (no quote, below intrinsic) keep NaN Greeks
+    with np.errstate(invalid="ignore", divide="ignore"):
+        greeks = black_scholes_greeks(spot, strike, t, iv, is_call, rate, div_yield)
+    columns["model_iv"][rows] = iv
+    for name in ("price", "delta", "gamma", "theta", "vega", "rho"):
+        columns["model_" + name][rows] = greeks[name]
+    return rows
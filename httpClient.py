@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import random
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+DEFAULT_BASE_URL = "https://api.tastytrade.com/v1"
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+
+
+class HttpResponse:
+    """
+    Fully-read response. The body is parsed once, so one response can be handed to
+    every caller of a coalesced GET.
+    """
+
+    def __init__(self, status: int, data: Any, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.data = data
+        self.headers = headers or {}
+
+    async def json(self) -> Any:
+        return self.data
+
+
+class TastyHttpClient:
+    """
+    Shared async client for the REST calls in trade_assister: one keep-alive connection
+    pool, a bound on in-flight requests, backoff on 429 (honouring Retry-After) and on
+    transient 5xx/connection errors for idempotent calls, and coalescing of identical in-flight GETs.
+    Paths are relative to base_url, which defaults to TASTY_API_URL if set, so the whole
+    module can be pointed at a local stand-in server.
+
+    Example usage::
+
+        async with TastyHttpClient.from_session(session) as client:
+            response = await client.get(f'/orders/{order_id}')
+    """
+
+    def __init__(self, base_url: Optional[str] = None, headers: Optional[Dict[str, str]] = None,
+                 max_connections: int = 10, max_concurrency: int = 8, max_retries: int = 5,
+                 backoff: float = 0.25, timeout: float = 10.0):
+        """
+        :param max_connections: size of the keep-alive connection pool.
+        :param max_concurrency: maximum number of requests in flight at once.
+        :param max_retries: retries of a request on 429/5xx/connection errors.
+        :param backoff: base delay in seconds, doubled on every retry.
+        """
+        self.base_url = (base_url or os.getenv("TASTY_API_URL", DEFAULT_BASE_URL)).rstrip("/")
+        self.headers = headers or {}
+        self.max_connections = max_connections
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.retries = 0
+        self.coalesced = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @classmethod
+    def from_session(cls, session, **kwargs) -> "TastyHttpClient":
+        """
+        Builds a client that authenticates with a tastytrade Session's token.
+        """
+        return cls(headers={"Authorization": session.session_token}, **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _client(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=self.timeout
+            )
+        return self._session
+
+    def url(self, path: str) -> str:
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return self.base_url + "/" + path.lstrip("/")
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (0.5 + random.random())
+
+    async def request(self, method: str, path: str, **kwargs) -> HttpResponse:
+        """
+        Sends a request, retrying 429s for every method. 5xx responses and connection
+        errors are only retried for idempotent methods, so a POSTed order is never
+        submitted twice.
+        """
+        url = self.url(path)
+        idempotent = method in IDEMPOTENT_METHODS
+        retry_statuses = RETRY_STATUSES if idempotent else {429}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    async with self._client().request(method, url, **kwargs) as response:
+                        body = await response.read()
+                        if response.status not in retry_statuses or attempt == self.max_retries:
+                            try:
+                                data = json.loads(body) if body else None
+                            except ValueError:
+                                data = body.decode(errors="replace")
+                            return HttpResponse(response.status, data, dict(response.headers))
+                        retry_after = response.headers.get("Retry-After")
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not idempotent or attempt == self.max_retries:
+                    raise
+            self.retries += 1
+            await asyncio.sleep(self._retry_delay(attempt, retry_after))
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None) -> HttpResponse:
+        """
+        GETs a resource; concurrent identical GETs share one request and response. The
+        request runs in its own task, so a caller that is cancelled only stops waiting
+        and never cancels it for the others.
+        """
+        key = self.url(path) + "?" + json.dumps(params or {}, sort_keys=True, default=str)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self.request("GET", path, params=params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish_get(key, done))
+        return await asyncio.shield(task)
+
+    def _finish_get(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # mark the exception retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def post(self, path: str, json: Any = None) -> HttpResponse:
+        return await self.request("POST", path, json=json)
+
+    async def put(self, path: str, json: Any = None) -> HttpResponse:
+        return await self.request("PUT", path, json=json)
+
+    async def delete(self, path: str) -> HttpResponse:
+        return await self.request("DELETE", path)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
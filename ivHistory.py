@@ -0,0 +1,291 @@
+import math
+import os
+import pickle
+import time
+import weakref
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tastytrade", "iv_history")
+DEFAULT_WINDOW = 252
+# Minimum seconds between two samples of one symbol, so the window spans a useful
+# period instead of the last few hundred ticks
+DEFAULT_SAMPLE_INTERVAL = 60.0
+# Windows of contracts no longer listed are dropped once unsampled for this long (seconds)
+DEFAULT_MAX_AGE = 7 * 24 * 3600.0
+HISTORY_VERSION = 1
+
+
+def history_path(directory: Optional[str] = None) -> str:
+    return os.path.join(directory or os.getenv("IV_HISTORY_DIR", DEFAULT_HISTORY_DIR), "iv_history.bin")
+
+
+def _grow(array: np.ndarray, capacity: int, fill: float) -> np.ndarray:
+    grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class IVHistoryStore:
+    """
+    Rolling windows of the last `window` IV samples of every symbol of the chain,
+    persisted between sessions. Every symbol owns a slot in a set of NumPy arrays (low,
+    high, last sample time and a ring buffer of the samples), so a whole chain is
+    sampled, ranked and given percentiles with array operations instead of a Python
+    loop per contract. IV rank is O(1) from the cached low and high; the percentile
+    counts the samples below the IV, O(k) per contract but vectorized over the chain,
+    and a new sample rescans its window for the low and high, also O(k), at most once
+    per sample_interval.
+
+    Example usage::
+
+        history = IVHistoryStore.load()
+        history.record(".SPXW250410C5000", 0.182)
+        ranks, percentiles = history.query(state.streamer_symbols, state.column("iv"))
+        history.save(listed=state.streamer_symbols)
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.window = window
+        self.sample_interval = sample_interval
+        self._reset_slots()
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._slots
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _reset_slots(self, capacity: int = 1024) -> None:
+        #: symbol -> slot in the arrays below
+        self._slots: Dict[str, int] = {}
+        self._low = np.full(capacity, np.nan)
+        self._high = np.full(capacity, np.nan)
+        self._last_sampled = np.full(capacity, -np.inf)
+        self._sizes = np.zeros(capacity, dtype=np.intp)
+        # samples ever pushed, so the next one goes to position _counts % window of the ring
+        self._counts = np.zeros(capacity, dtype=np.intp)
+        self._samples = np.full((capacity, self.window), np.nan)
+        # bumped whenever slots are added or reassigned, invalidating the per-state row maps
+        self._version = 0
+        self._row_slots: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    def _slot(self, symbol: str) -> int:
+        slot = self._slots.get(symbol)
+        if slot is None:
+            slot = self._slots[symbol] = len(self._slots)
+            if slot == len(self._low):
+                capacity = 2 * slot
+                self._low = _grow(self._low, capacity, np.nan)
+                self._high = _grow(self._high, capacity, np.nan)
+                self._last_sampled = _grow(self._last_sampled, capacity, -np.inf)
+                self._sizes = _grow(self._sizes, capacity, 0)
+                self._counts = _grow(self._counts, capacity, 0)
+                self._samples = _grow(self._samples, capacity, np.nan)
+            self._version += 1
+        return slot
+
+    def _push(self, slot: int, iv: float, timestamp: float) -> None:
+        samples = self._samples[slot]
+        samples[self._counts[slot] % self.window] = iv
+        self._counts[slot] += 1
+        self._sizes[slot] = min(self._counts[slot], self.window)
+        self._low[slot] = np.nanmin(samples)
+        self._high[slot] = np.nanmax(samples)
+        self._last_sampled[slot] = timestamp
+
+    def samples(self, symbol: str) -> List[float]:
+        """
+        :return: the samples in the symbol's window, oldest first.
+        """
+        slot = self._slots.get(symbol)
+        if slot is None:
+            return []
+        count, size = int(self._counts[slot]), int(self._sizes[slot])
+        return self._samples[slot, np.arange(count - size, count) % self.window].tolist()
+
+    def record(self, symbol: str, iv: float, timestamp: Optional[float] = None) -> bool:
+        """
+        Adds a sample unless the symbol was sampled less than sample_interval ago.
+        :param timestamp: sample time in epoch seconds; defaults to now.
+        :return: True if the sample was added.
+        """
+        if iv is None or math.isnan(iv):
+            return False
+        timestamp = time.time() if timestamp is None else timestamp
+        slot = self._slot(symbol)
+        if timestamp - self._last_sampled[slot] < self.sample_interval:
+            return False
+        self._push(slot, float(iv), timestamp)
+        return True
+
+    def row_slots(self, state) -> np.ndarray:
+        """
+        :return: the slot of every row of a chain store, -1 for symbols without history.
+            Cached per store until symbols are added to it or to the history.
+        """
+        cached = self._row_slots.get(state)
+        if cached is not None and cached[0] == self._version and len(cached[1]) == state.size:
+            return cached[1]
+        slots = np.array([self._slots.get(symbol, -1) for symbol in state.streamer_symbols[:state.size]],
+                         dtype=np.intp)
+        self._row_slots[state] = (self._version, slots)
+        return slots
+
+    def record_rows(self, state, rows: Iterable[int]) -> None:
+        """
+        Samples the IV of chain store rows, timestamped with their last Greeks event.
+        Only the rows due for a sample leave NumPy.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        ivs = state.columns["iv"][rows]
+        timestamps = state.columns["greeks_time"][rows] / 1000
+        timestamps = np.where(np.isnan(timestamps), time.time(), timestamps)
+        known = ~np.isnan(ivs)
+        slots = self.row_slots(state)[rows]
+        new = known & (slots < 0)
+        if new.any():
+            for row in rows[new].tolist():
+                self._slot(state.streamer_symbols[row])
+            slots = self.row_slots(state)[rows]
+        due = np.flatnonzero(known & (timestamps - self._last_sampled[slots] >= self.sample_interval))
+        for slot, iv, timestamp in zip(slots[due].tolist(), ivs[due].tolist(), timestamps[due].tolist()):
+            self._push(slot, iv, timestamp)
+
+    def update_rows(self, state, rows: Optional[Iterable[int]] = None) -> None:
+        """
+        Samples the given chain rows and writes their IV rank and percentile into the
+        store's iv_rank / iv_percentile columns.
+        :param rows: store rows that changed; defaults to every listed row.
+        """
+        rows = state.listed_rows() if rows is None else np.fromiter(rows, dtype=np.intp)
+        self.record_rows(state, rows)
+        ranks, percentiles = self._rank_slots(self.row_slots(state)[rows], state.columns["iv"][rows])
+        state.columns["iv_rank"][rows] = ranks
+        state.columns["iv_percentile"][rows] = percentiles
+
+    def low(self, symbol: str) -> float:
+        slot = self._slots.get(symbol)
+        return math.nan if slot is None else float(self._low[slot])
+
+    def high(self, symbol: str) -> float:
+        slot = self._slots.get(symbol)
+        return math.nan if slot is None else float(self._high[slot])
+
+    def rank(self, symbol: str, iv: float) -> float:
+        """
+        :return: where iv sits between the window's low and high, 0-100 (as calculate_iv_rank).
+        """
+        return float(self.query([symbol], [iv])[0][0])
+
+    def percentile(self, symbol: str, iv: float) -> float:
+        """
+        :return: percentage of samples in the window below iv.
+        """
+        return float(self.query([symbol], [iv])[1][0])
+
+    def query(self, symbols: Iterable[str], ivs: Iterable[float]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        IV rank and percentile of a whole chain in one call.
+        :return: (ranks, percentiles) arrays aligned with symbols, NaN where there is no history.
+        """
+        slots = np.array([self._slots.get(symbol, -1) for symbol in symbols], dtype=np.intp)
+        return self._rank_slots(slots, np.asarray(ivs, dtype=float))
+
+    def _rank_slots(self, slots: np.ndarray, ivs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        ranks = np.full(len(slots), np.nan)
+        percentiles = np.full(len(slots), np.nan)
+        known = np.flatnonzero((slots >= 0) & ~np.isnan(ivs))
+        if not len(known):
+            return ranks, percentiles
+        slots, ivs = slots[known], ivs[known]
+        low, high = self._low[slots], self._high[slots]
+        span = high - low
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ranks[known] = np.where(span > 0, (ivs - low) / span * 100, np.where(np.isnan(span), np.nan, 0.0))
+            # empty ring buffer cells are NaN and never compare below
+            below = np.count_nonzero(self._samples[slots] < ivs[:, None], axis=1)
+            percentiles[known] = below / self._sizes[slots] * 100
+        return ranks, percentiles
+
+    def prune(self, listed: Iterable[str] = (), max_age: float = DEFAULT_MAX_AGE,
+              now: Optional[float] = None) -> int:
+        """
+        Drops the windows of contracts that are no longer listed and have not been sampled
+        for max_age seconds (expired daily contracts, mostly), so the history doesn't grow
+        forever. Windows of listed contracts are always kept.
+        :return: number of windows dropped.
+        """
+        listed = set(listed)
+        cutoff = (time.time() if now is None else now) - max_age
+        stale = {
+            symbol for symbol, slot in self._slots.items()
+            if symbol not in listed and self._last_sampled[slot] < cutoff
+        }
+        if not stale:
+            return 0
+        kept = [(symbol, slot) for symbol, slot in self._slots.items() if symbol not in stale]
+        self._compact(kept)
+        return len(stale)
+
+    def _compact(self, kept: List[Tuple[str, int]]) -> None:
+        old = np.array([slot for _, slot in kept], dtype=np.intp)
+        names = ("_low", "_high", "_last_sampled", "_sizes", "_counts", "_samples")
+        values = [getattr(self, name)[old] for name in names]
+        self._reset_slots(max(1024, len(kept)))
+        for name, array in zip(names, values):
+            getattr(self, name)[:len(kept)] = array
+        self._slots = {symbol: slot for slot, (symbol, _) in enumerate(kept)}
+
+    def save(self, path: Optional[str] = None, listed: Iterable[str] = ()) -> str:
+        """
+        Prunes stale windows (see prune) and writes the rest to disk as a
+        zlib-compressed pickle.
+        :param listed: streamer symbols of the chains watched; their windows are kept.
+        :return: path of the file written.
+        """
+        dropped = self.prune(listed)
+        if dropped:
+            print(f"[DEBUG] Dropped {dropped} stale IV histories.")
+        path = path or history_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        payload = {
+            "version": HISTORY_VERSION,
+            "window": self.window,
+            "sample_interval": self.sample_interval,
+            "symbols": {
+                symbol: (self.samples(symbol), float(self._last_sampled[slot]))
+                for symbol, slot in self._slots.items()
+            },
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(tmp_path, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None, window: int = DEFAULT_WINDOW,
+             sample_interval: float = DEFAULT_SAMPLE_INTERVAL) -> "IVHistoryStore":
+        """
+        Reads the history saved by a previous session; starts empty if there is none.
+        """
+        store = cls(window, sample_interval)
+        path = path or history_path()
+        try:
+            with open(path, "rb") as file:
+                payload = pickle.loads(zlib.decompress(file.read()))
+        except FileNotFoundError:
+            return store
+        except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as e:
+            print(f"[DEBUG] Ignoring unreadable IV history {path}: {e}")
+            return store
+        if payload.get("version") != HISTORY_VERSION:
+            return store
+        for symbol, (samples, last_sampled) in payload["symbols"].items():
+            slot = store._slot(symbol)
+            for iv in samples[-window:]:
+                store._push(slot, iv, last_sampled)
+        return store
@@ -1,5 +1,5 @@
 import sys
-from tastytrade import DXLinkStreamer, Session
+from tastytrade import Account, DXLinkStreamer, Session
 from tastytrade.dxfeed import Greeks, Quote
 from tastytrade.instruments import get_option_chain
 from typing import Dict, Any
@@ -8,11 +8,28 @@ from decimal import Decimal
 from qasync import QEventLoop
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QTableWidget, QTableWidgetItem, QMessageBox,
-    QVBoxLayout, QWidget, QHeaderView, QPushButton, QInputDialog, QTabWidget
+    QVBoxLayout, QWidget, QHeaderView, QPushButton, QInputDialog, QTabWidget, QTableView,
+    QComboBox, QLabel
 )
+from PySide6.QtCore import QTimer
 import asyncio
+import time
+import numpy as np
 from helpers import get_tasty_daily
 from canvas import ProfitLossCanvas
+from marketData import OptionChainState
+from greeksEngine import implied_underlying, update_model_greeks
+from ivHistory import DEFAULT_SAMPLE_INTERVAL, IVHistoryStore
+from positionsEngine import PositionBook
+from payoffEngine import legs_to_arrays, payoff_curves, pnl_surface
+from chainCache import DEFAULT_TTL, diff_options, load_chain, save_chain
+from marketDataModel import MarketDataModel
+from refreshScheduler import RefreshScheduler
+from replayFeed import ReplayStreamer, SessionRecorder
+from tickArchive import TickArchiveWriter
+from subscriptionManager import SubscriptionManager
+from streamWorkers import GREEKS, ShardedFeed, apply_updates, route_symbols, streamer_credentials
+from metrics import event_time, metrics, serve_prometheus
 from trade_assister import * 
 import os
 
@@ -20,8 +37,34 @@ import os
 from qdarkstyle import load_stylesheet
 os.environ["QT_FONT_DPI"] = "96"  # Adjust for High DPI scaling
 
-def get_session(session: Session) -> DXLinkStreamer:
-    return(DXLinkStreamer(session, reconnect_args=(session,)))
+def get_session(session: Session, states=(), managers=None) -> DXLinkStreamer:
+    """
+    :param states: chain states being streamed, re-subscribed after a reconnect.
+    :param managers: underlying symbol -> SubscriptionManager, filled in once streaming
+        starts; windowed chains only re-subscribe their current window.
+    """
+    return(DXLinkStreamer(session, reconnect_fn=resubscribe, reconnect_args=(states, {} if managers is None else managers)))
+
+
+async def resubscribe(streamer, states, managers):
+    """
+    Reconnect hook of the streamer: DXLink drops every subscription with the websocket,
+    so the symbols subscribed at the time of the reconnect are subscribed again.
+    """
+    symbols = []
+    for state in states:
+        manager = managers.get(state.underlying_symbol)
+        if manager is not None:
+            symbols.extend(manager.subscribed)
+        else:
+            symbols.extend(option.streamer_symbol for option in state.options if option is not None)
+    print(f"[DEBUG] Streamer reconnected, re-subscribing {len(symbols)} symbols.")
+    if symbols:
+        await streamer.subscribe(Greeks, symbols)
+        await streamer.subscribe(Quote, symbols)
+    underlyings = [state.underlying_symbol for state in states if state.underlying_symbol]
+    if underlyings:
+        await streamer.subscribe(Quote, underlyings)
     
 def reformat_model(model: Dict[str, Any]) -> Dict[str, Any]:
     reformatted = model.copy()
@@ -63,6 +106,7 @@ class TastyTraderAPI(QMainWindow):
         self.positions_tab = QWidget()
         self.place_order_tab = QWidget()
         self.analytics_tab = QWidget()
+        self.metrics_tab = QWidget()
 
         # Add tabs to the QTabWidget
         self.tabs.addTab(self.market_data_tab, "Market Data")
@@ -70,14 +114,15 @@ class TastyTraderAPI(QMainWindow):
         self.tabs.addTab(self.positions_tab, "Positions")
         self.tabs.addTab(self.place_order_tab, "Place Order")
         self.tabs.addTab(self.analytics_tab, "Analytics")
+        self.tabs.addTab(self.metrics_tab, "Metrics")
 
         # Set up each tab
         self.setup_market_data_tab()
         self.setup_place_order_tab()
         self.setup_analytics_tab()
-        self.populate_table([])
         self.setup_positions_tab([])
         self.setup_active_orders_tab([])
+        self.setup_metrics_tab()
 
     def setup_place_order_tab(self):
         layout = QVBoxLayout()
@@ -120,6 +165,7 @@ class TastyTraderAPI(QMainWindow):
 
 
     def setup_positions_tab(self, data):
+        layout = QVBoxLayout()
         self.current_positions_table = QTableWidget()
         self.current_positions_table.setColumnCount(7)
         self.current_positions_table.setHorizontalHeaderLabels([
@@ -129,16 +175,49 @@ class TastyTraderAPI(QMainWindow):
         self.current_positions_table.setEditTriggers(QTableWidget.NoEditTriggers)
         self.current_positions_table.setSelectionBehavior(QTableWidget.SelectRows)
         self.current_positions_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.positions_totals_label = QLabel()
+
+        layout.addWidget(self.current_positions_table)
+        layout.addWidget(self.positions_totals_label)
+        self.positions_tab.setLayout(layout)
+        self.populate_positions_table(data)
 
+    def populate_positions_table(self, data):
         self.current_positions_table.setRowCount(len(data))
         for row_idx, entry in enumerate(data):
-            self.current_positions_table.setItem(row_idx, 0, QTableWidgetItem(entry.get("symbol", "N/A")))
-            self.current_positions_table.setItem(row_idx, 1, QTableWidgetItem(str(entry.get("quantity", "N/A"))))
-            self.current_positions_table.setItem(row_idx, 2, QTableWidgetItem(str(entry.get("avg_price", "N/A"))))
-            self.current_positions_table.setItem(row_idx, 3, QTableWidgetItem(str(entry.get("current_price", "N/A"))))
-            self.current_positions_table.setItem(row_idx, 4, QTableWidgetItem(str(entry.get("pnl", "N/A"))))
-            self.current_positions_table.setItem(row_idx, 5, QTableWidgetItem(str(entry.get("pnl_percent", "N/A"))))
-            self.current_positions_table.setItem(row_idx, 6, QTableWidgetItem(str(entry.get("market_value", "N/A"))))
+            self.set_position_row(row_idx, entry)
+
+    def set_position_row(self, row_idx, entry):
+        self.current_positions_table.setItem(row_idx, 0, QTableWidgetItem(entry.get("symbol", "N/A")))
+        for column, key in enumerate(["quantity", "avg_price", "current_price", "pnl", "pnl_percent", "market_value"], 1):
+            value = entry.get(key, "N/A")
+            if isinstance(value, float):
+                value = "N/A" if np.isnan(value) else round(value, 2)
+            self.current_positions_table.setItem(row_idx, column, QTableWidgetItem(str(value)))
+
+    def load_positions(self, book):
+        """
+        Replaces the position book; both the Positions and Analytics tabs follow its updates.
+        """
+        self.position_book = book
+        book.subscribe(self.update_positions_rows)
+        book.subscribe(self.update_portfolio_greeks)
+        self.populate_positions_table(book.positions)
+        for state in self.chain_states.values():
+            book.attach(state)
+        book.flush()
+
+    def update_positions_rows(self, changed, totals):
+        for index in changed:
+            self.set_position_row(index, self.position_book.positions[index])
+        self.positions_totals_label.setText(
+            "Market Value: {market_value:.2f}  PnL: {pnl:.2f}".format(**totals)
+        )
+
+    def update_portfolio_greeks(self, changed, totals):
+        self.portfolio_greeks_label.setText(
+            "Net Delta: {delta:.2f}  Gamma: {gamma:.2f}  Theta: {theta:.2f}  Vega: {vega:.2f}".format(**totals)
+        )
 
     def setup_active_orders_tab(self, data):
         self.active_orders_table = QTableWidget()
@@ -154,41 +233,190 @@ class TastyTraderAPI(QMainWindow):
         
     def setup_market_data_tab(self):
         layout = QVBoxLayout()
-        self.table = QTableWidget()
-        self.table.setColumnCount(9)
-        self.table.setHorizontalHeaderLabels([
-            "Event Symbol", "Delta", "Gamma", "Theta", "Implied Volatility", "Vega", "Rho",
-            "Bid Price", "Ask Price"
-        ])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.table.setSelectionMode(QTableWidget.SingleSelection)
-
-        layout.addWidget(self.table)
+        # one chain state per underlying; the box picks the one the table shows
+        self.chain_states = {}
+        self.underlying_box = QComboBox()
+        self.underlying_box.currentIndexChanged.connect(self.handle_underlying)
+        self.greeks_source_box = QComboBox()
+        self.greeks_source_box.addItem("Greeks: dxfeed", "dxfeed")
+        self.greeks_source_box.addItem("Greeks: Black-Scholes (local)", "model")
+        self.greeks_source_box.currentIndexChanged.connect(self.handle_greeks_source)
+        self.risk_free_rate = float(os.getenv("RISK_FREE_RATE", "0"))
+        # "now" for local pricing: wall clock live, the recording's time on a replay
+        self.clock = time.time
+        self.iv_history = IVHistoryStore.load(
+            sample_interval=float(os.getenv("IV_SAMPLE_INTERVAL", DEFAULT_SAMPLE_INTERVAL))
+        )
+
+        self.market_data_model = MarketDataModel()
+        self.market_data_table = QTableView()
+        self.market_data_table.setModel(self.market_data_model)
+        self.market_data_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        # Fixed row heights let the view skip measuring rows it does not paint
+        self.market_data_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.market_data_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.market_data_table.setSelectionBehavior(QTableView.SelectRows)
+        self.market_data_table.setSelectionMode(QTableView.SingleSelection)
+        self.refresh_scheduler = RefreshScheduler(
+            self.refresh_table_rows, rate_hz=float(os.getenv("REFRESH_RATE_HZ", "20")), parent=self
+        )
+        self.refresh_scheduler.flushed.connect(self.show_refresh_stats)
+
+        layout.addWidget(self.underlying_box)
+        layout.addWidget(self.greeks_source_box)
+        layout.addWidget(self.market_data_table)
         self.market_data_tab.setLayout(layout)
 
 
     def setup_analytics_tab(self):
         layout = QVBoxLayout()
         self.profit_loss_canvas = ProfitLossCanvas(self)
+        self.payoff_legs = []
+        self.position_book = PositionBook()
+        self.portfolio_greeks_label = QLabel()
+        self.payoff_state = None
+        self.payoff_arrays = None
+        self.payoff_prices = None
+        payoff_button = QPushButton("Display Payoff Diagram")
+        payoff_button.clicked.connect(self.handle_display_payoff_diagram)
+        layout.addWidget(self.portfolio_greeks_label)
         layout.addWidget(self.profit_loss_canvas)
+        layout.addWidget(payoff_button)
         self.analytics_tab.setLayout(layout)
         
-    def populate_table(self, table_data):
-        self.table.setRowCount(len(table_data))
-        for row_idx, entry in enumerate(table_data):
-            self.table.setItem(row_idx, 0, QTableWidgetItem(entry.get("event_symbol", "N/A")))
-            self.table.setItem(row_idx, 1, QTableWidgetItem(str(entry.get("delta", "N/A"))))
-            self.table.setItem(row_idx, 2, QTableWidgetItem(str(entry.get("gamma", "N/A"))))
-            self.table.setItem(row_idx, 3, QTableWidgetItem(str(entry.get("theta", "N/A"))))
-            self.table.setItem(row_idx, 4, QTableWidgetItem(str(entry.get("imp_vol", "N/A"))))
-            self.table.setItem(row_idx, 5, QTableWidgetItem(str(entry.get("vega", "N/A"))))
-            self.table.setItem(row_idx, 6, QTableWidgetItem(str(entry.get("rho", "N/A"))))
-            self.table.setItem(row_idx, 7, QTableWidgetItem(str(entry.get("bid_price", "N/A"))))
-            self.table.setItem(row_idx, 8, QTableWidgetItem(str(entry.get("ask_price", "N/A"))))
+    def setup_metrics_tab(self):
+        layout = QVBoxLayout()
+        self.metrics_table = QTableWidget()
+        self.metrics_table.setColumnCount(8)
+        self.metrics_table.setHorizontalHeaderLabels(
+            ["Metric", "Count", "Rate/s", "Mean (ms)", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)"]
+        )
+        self.metrics_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.metrics_table)
+        if not metrics.enabled:
+            layout.addWidget(QLabel("Metrics are disabled; start the app with METRICS=1 to collect them."))
+        self.metrics_tab.setLayout(layout)
+        if metrics.enabled:
+            self.metrics_timer = QTimer(self)
+            self.metrics_timer.timeout.connect(self.update_metrics_table)
+            self.metrics_timer.start(1000)
+            # a heartbeat that fires late measures how long the event loop was blocked
+            self.heartbeat_interval = 0.1
+            self.last_heartbeat = time.perf_counter()
+            self.heartbeat_timer = QTimer(self)
+            self.heartbeat_timer.timeout.connect(self.heartbeat)
+            self.heartbeat_timer.start(int(self.heartbeat_interval * 1000))
+
+    def heartbeat(self):
+        now = time.perf_counter()
+        metrics.observe("loop_lag", max(0.0, now - self.last_heartbeat - self.heartbeat_interval))
+        self.last_heartbeat = now
+
+    def update_metrics_table(self):
+        rates = metrics.rates()
+        rows = [(name, count, rates.get(name, 0.0), None) for name, count in sorted(metrics.counters.items())]
+        rows += [(entry["name"], entry["count"], None, entry) for entry in metrics.snapshot()]
+        self.metrics_table.setRowCount(len(rows))
+        for row_idx, (name, count, rate, entry) in enumerate(rows):
+            values = [name, str(count), "" if rate is None else f"{rate:.1f}"]
+            if entry is not None:
+                values += [f"{entry[key]:.3f}" for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")]
+            else:
+                values += [""] * 5
+            for column, value in enumerate(values):
+                self.metrics_table.setItem(row_idx, column, QTableWidgetItem(value))
+
+    def populate_table(self, state):
+        self.market_data_model.set_state(state)
+
+    def add_chain_state(self, state):
+        """
+        Registers (or replaces) the chain state of an underlying and shows it if it is
+        the selected one. Positions are priced against every registered chain.
+        """
+        symbol = state.underlying_symbol
+        self.chain_states[symbol] = state
+        state.set_greeks_source(self.greeks_source_box.currentData())
+        self.position_book.attach(state)
+        self.position_book.flush()
+        if self.underlying_box.findData(symbol) < 0:
+            # the first underlying added becomes current and is shown by handle_underlying
+            self.underlying_box.addItem(symbol, symbol)
+        elif self.underlying_box.currentData() == symbol:
+            self.populate_table(state)
+
+    def handle_underlying(self):
+        state = self.chain_states.get(self.underlying_box.currentData())
+        if state is None:
+            return
+        self.populate_table(state)
+
+    def queue_table_row(self, row, state=None):
+        """
+        Marks a chain row as changed; the refresh scheduler processes it on its next frame.
+        :param state: chain state the row belongs to; defaults to the one shown. Rows of
+            underlyings that are not shown still reprice positions and sample IV history,
+            only the view refresh is skipped.
+        """
+        state = self.market_data_model.state if state is None else state
+        self.refresh_scheduler.mark_dirty((state, row))
+        self.position_book.update_row(row, state)
+
+    def refresh_table_rows(self, keys):
+        """
+        Processes the chain rows changed since the last refresh, per chain state. With
+        local Greeks selected the changed rows are repriced first, or the whole chain if
+        the underlying moved; only the rows of the state shown are pushed to the view.
+        :param keys: (chain state, store row) pairs queued by queue_table_row.
+        """
+        if metrics.enabled:
+            start = time.perf_counter()
+        rows_by_state = {}
+        for state, row in keys:
+            rows_by_state.setdefault(state, []).append(row)
+        shown = self.market_data_model.state
+        for state, rows in rows_by_state.items():
+            # checked before model repricing, which only returns listed (option) rows
+            underlying_moved = state.index.get(state.underlying_symbol) in rows
+            if state.greeks_source == "model":
+                if underlying_moved:
+                    rows = None
+                rows = update_model_greeks(state, rows, self.risk_free_rate, now=self.clock())
+                self.position_book.update_rows(state.listed_rows() if rows is None else rows, state)
+            self.iv_history.update_rows(state, rows)
+            if state is self.payoff_state:
+                # the T+0 curve only moves with the IV / time to expiry of the held contracts
+                reprice = not set(self.position_book.held_rows(state)).isdisjoint(rows)
+                if reprice or underlying_moved:
+                    self.update_live_payoff(state.underlying_price(), reprice)
+            if state is shown:
+                self.market_data_model.refresh_rows(rows)
+        self.position_book.flush()
+        if metrics.enabled:
+            metrics.observe("render", time.perf_counter() - start)
+
+    def handle_greeks_source(self):
+        # one source for every chain, so the portfolio Greeks never mix the two
+        for state in self.chain_states.values():
+            state.set_greeks_source(self.greeks_source_box.currentData())
+            if state.greeks_source == "model":
+                update_model_greeks(state, rate=self.risk_free_rate, now=self.clock())
+            self.position_book.attach(state)
+        if self.market_data_model.state is not None:
+            self.market_data_model.refresh_all()
+        self.position_book.flush()
+
+    def save_iv_history(self):
+        # histories of contracts still listed are kept however long ago they were sampled
+        self.iv_history.save(listed=[
+            state.streamer_symbols[row] for state in self.chain_states.values() for row in state.listed_rows()
+        ])
 
-        self.table.viewport().update()
+    def show_refresh_stats(self, stats):
+        self.statusBar().showMessage(
+            "Updates: {received}  Coalesced: {coalesced}  Queue: {queue_depth} (max {max_queue_depth})".format(**stats)
+        )
 
 
 
@@ -213,94 +441,358 @@ class TastyTraderAPI(QMainWindow):
             return
 
     def handle_display_payoff_diagram(self):
-        QMessageBox.information(self, "Payoff Diagram", "Payoff diagram functionality is not implemented yet.")
+        # one underlying per diagram: the positions of the chain shown
+        state = self.market_data_model.state
+        self.payoff_legs = [] if state is None else self.position_book.payoff_legs(state, now=self.clock())
+        if not self.payoff_legs:
+            QMessageBox.information(self, "Payoff Diagram", "No positions to analyze.")
+            return
+        legs = legs_to_arrays(self.payoff_legs)
+        spot = state.underlying_price()
+        if np.isnan(spot):
+            spot = implied_underlying(state)
+        if np.isnan(spot):
+            spot = float(np.mean(legs["strike"]))
+        curves = payoff_curves(legs, spot, rate=self.risk_free_rate)
+        # the price grid stays fixed; live ticks only move the T+0 curve and spot marker
+        self.payoff_state, self.payoff_arrays, self.payoff_prices = state, legs, curves["prices"]
+        self.profit_loss_canvas.start_live(curves["prices"], curves["expiry"], curves["theoretical"], spot)
+
+    def update_live_payoff(self, spot, reprice=True):
+        """
+        Moves the spot marker and, with reprice, recomputes the T+0 curve from the live IV
+        and time to expiry of the legs plotted.
+        """
+        theoretical = None
+        if reprice:
+            legs = self.position_book.payoff_legs(self.payoff_state, now=self.clock())
+            # a changed set of positions needs a new diagram; keep the plotted legs until then
+            if len(legs) == len(self.payoff_legs):
+                self.payoff_legs, self.payoff_arrays = legs, legs_to_arrays(legs)
+            theoretical = pnl_surface(self.payoff_prices, [0.0], self.payoff_arrays, rate=self.risk_free_rate)[:, 0, 0]
+        self.profit_loss_canvas.update_live(theoretical, None if np.isnan(spot) else spot)
 
 async def fetch_and_display_data(window: TastyTraderAPI):
     
-    symbol = "SPX"
+    # comma-separated underlyings and the number of expirations (from today on) to watch
+    symbols = [symbol.strip().upper() for symbol in os.getenv("TASTY_SYMBOLS", "SPX").split(",") if symbol.strip()]
+    expirations = int(os.getenv("TASTY_EXPIRATIONS", "1"))
+    # TASTY_WORKERS > 0 shards the subscriptions across that many streaming processes
+    workers = int(os.getenv("TASTY_WORKERS", "0"))
+    # set TASTY_REPLAY to a recording (e.g. combined_data.json) to run without network or credentials
+    replay_path = os.getenv("TASTY_REPLAY")
+    if replay_path:
+        await replay_market_data(window, replay_path, float(os.getenv("TASTY_REPLAY_SPEED", "1")), workers)
+        return
+
     # use the .env file to get the username and password
     username = os.getenv("TASTY_USERNAME")
     password = os.getenv("TASTY_PASSWORD")
     if not username or not password:
         print("[DEBUG] Username and password not found in environment variables.")
         return
-    
-    session = Session(username=username, password=password)
-    if not session.validate():
-        print("[DEBUG] Session validation failed.")
-        return
-    
+
     today = await asyncio.to_thread(get_tasty_daily)
     print("[DEBUG] Today's date: {}".format(today))
 
-    chain = await asyncio.to_thread(get_option_chain, session, symbol)
-    if not chain or today not in chain:
-        print("[DEBUG] No options available for today.")
+    # paint from the on-disk chain cache first; the live chain is reconciled in the background
+    states, cached_options = {}, {}
+    for symbol in symbols:
+        chain = await asyncio.to_thread(load_chain, symbol, today, float(os.getenv("CHAIN_CACHE_TTL", DEFAULT_TTL)))
+        options = select_options(chain, today, expirations) if chain else []
+        if options:
+            print(f"[DEBUG] Loaded {len(options)} {symbol} options from the chain cache.")
+            cached_options[symbol] = options
+            states[symbol] = prepare_table_data(OptionChainState(underlying_symbol=symbol), options)
+            display_table_data(window, states[symbol])
+
+    session = await asyncio.to_thread(Session, username, password)
+    if not await asyncio.to_thread(session.validate):
+        print("[DEBUG] Session validation failed.")
         return
 
-    subs_list = [option.streamer_symbol for option in chain[today]]
-    print(f"[DEBUG] Subscribing to {len(subs_list)} symbols.")
-    greeks_data, quotes_data = await fetch_streamer_data(session, subs_list)
-
-    if not greeks_data or not quotes_data:
-        print("[DEBUG] No data received from streamer.")
+    positions = await asyncio.to_thread(fetch_positions, session, symbols)
+    window.load_positions(PositionBook.from_positions(positions))
+
+    for symbol in symbols:
+        if symbol in cached_options:
+            continue
+        chain = await asyncio.to_thread(fetch_option_chain, session, symbol, today)
+        options = select_options(chain, today, expirations) if chain else []
+        if not options:
+            print(f"[DEBUG] No {symbol} options available from {today}.")
+            continue
+        states[symbol] = prepare_table_data(OptionChainState(underlying_symbol=symbol), options)
+        display_table_data(window, states[symbol])
+    if not states:
         return
 
-    table_data = prepare_table_data(chain[today], greeks_data, quotes_data)
-    display_table_data(window, table_data)
-
+    subs_list = [option.streamer_symbol for state in states.values() for option in state.options if option is not None]
+    print(f"[DEBUG] Subscribing to {len(subs_list)} symbols.")
+    if workers > 0:
+        # worker processes own the subscriptions, so cached chains are not reconciled here
+        await stream_sharded(window, list(states.values()), subs_list, workers,
+                             credentials=streamer_credentials(session))
+        return
 
-async def fetch_streamer_data(session, subs_list):
-    streamer = await DXLinkStreamer(session, reconnect_args=(session,))
+    managers = {}
+    async with get_session(session, list(states.values()), managers) as streamer:
+        record_path = os.getenv("TASTY_RECORD")
+        if record_path:
+            streamer = SessionRecorder(
+                streamer, [option for state in states.values() for option in state.options if option is not None]
+            )
+            QApplication.instance().aboutToQuit.connect(lambda: streamer.save(record_path))
+        archives = {}
+        if os.getenv("TICK_ARCHIVE", "").lower() in ("1", "true", "yes"):
+            for symbol in states:
+                archives[symbol] = TickArchiveWriter(symbol, today)
+                QApplication.instance().aboutToQuit.connect(archives[symbol].close)
+        managers.update(subscription_managers(window, streamer, states.values()))
+        # keep references so the background refreshes are not garbage collected
+        refresh_tasks = [
+            asyncio.create_task(refresh_cached_chain(
+                window, session, streamer, states[symbol], symbol, today, expirations, options, managers.get(symbol)
+            ))
+            for symbol, options in cached_options.items()
+        ]
+        await stream_market_data(window, streamer, list(states.values()), subs_list, archives, managers)
+
+
+def select_options(chain, today, expirations):
+    """
+    :return: the options of the first `expirations` expiration dates on or after today.
+    """
+    dates = sorted(expiration for expiration in chain if expiration >= today)[:expirations]
+    return [option for expiration in dates for option in chain[expiration]]
+
+
+def fetch_option_chain(session, symbol, today):
+    """
+    Downloads the option chain and stores it in the chain cache.
+    """
+    chain = get_option_chain(session, symbol)
+    if chain:
+        save_chain(symbol, today, chain)
+    return chain
+
+
+def fetch_positions(session, symbols):
+    """
+    :return: open positions on the symbols across every account of the session.
+    """
+    positions = []
+    for account in Account.get_accounts(session):
+        positions.extend(account.get_positions(session, underlying_symbols=symbols))
+    return positions
+
+
+async def refresh_cached_chain(window, session, streamer, state, symbol, today, expirations, cached_options,
+                               manager=None):
+    """
+    Fetches the live chain after painting from cache, updates the cache, and
+    subscribes/unlists the contracts that were added or removed since it was saved.
+    :param manager: SubscriptionManager of the chain, which then decides what to subscribe.
+    """
+    chain = await asyncio.to_thread(fetch_option_chain, session, symbol, today)
+    options = select_options(chain, today, expirations) if chain else []
+    if not options:
+        return
+    added, removed = diff_options(cached_options, options)
+    print(f"[DEBUG] {symbol} chain refresh: {len(added)} options added, {len(removed)} removed.")
+    if removed:
+        state.remove_options(removed)
+    if added:
+        state.add_options(added)
+    if manager is not None:
+        await manager.refresh()
+    else:
+        if removed:
+            await streamer.unsubscribe(Greeks, removed)
+            await streamer.unsubscribe(Quote, removed)
+        if added:
+            added_symbols = [option.streamer_symbol for option in added]
+            await streamer.subscribe(Greeks, added_symbols)
+            await streamer.subscribe(Quote, added_symbols)
+    if added or removed:
+        window.add_chain_state(state)
+
+
+async def replay_market_data(window, path, speed, workers=0):
+    """
+    Drives the Market Data tab from a recorded session instead of the live feed.
+    :param speed: playback rate relative to the recording; 0 replays as fast as possible.
+    :param workers: number of streaming processes to shard the replay across; 0 replays in-process.
+    """
+    async with ReplayStreamer(path, speed=speed) as streamer:
+        # recorded contracts have long expired by the wall clock
+        window.clock = streamer.clock
+        underlying_symbol = streamer.options[0].underlying_symbol if streamer.options else None
+        state = prepare_table_data(OptionChainState(underlying_symbol=underlying_symbol), streamer.options)
+        display_table_data(window, state)
+        subs_list = [option.streamer_symbol for option in streamer.options]
+        print(f"[DEBUG] Replaying {len(subs_list)} symbols from {path}.")
+        if workers > 0:
+            await stream_sharded(window, [state], subs_list, workers, replay_path=path, replay_speed=speed)
+        else:
+            managers = subscription_managers(window, streamer, [state])
+            await stream_market_data(window, streamer, [state], subs_list, managers=managers)
+
+
+async def stream_sharded(window, states, subs_list, workers, **source):
+    """
+    Streams through worker processes (see streamWorkers) and writes the batches they
+    publish into the chain states.
+    :param source: credentials for the live feed, or replay_path / replay_speed.
+    """
+    underlyings = [state.underlying_symbol for state in states if state.underlying_symbol]
+    routes = []
+    # recorded event times are from the original session, so feed lag is only meaningful live
+    live = not source.get("replay_path")
+
+    def on_updates(shard, updates):
+        if metrics.enabled:
+            received = time.time()
+            start = time.perf_counter()
+        for state_id, rows in apply_updates(states, routes[shard], updates).items():
+            state = states[state_id]
+            for row in rows.tolist():
+                window.queue_table_row(row, state)
+        if metrics.enabled:
+            metrics.observe("merge", time.perf_counter() - start)
+            greeks = updates["kind"] == GREEKS
+            metrics.count("events_greeks", int(np.count_nonzero(greeks)))
+            metrics.count("events_quote", len(updates) - int(np.count_nonzero(greeks)))
+            metrics.observe_many("transport", received - updates["received_at"])
+            if live:
+                timed = greeks & (updates["time"] > 0)
+                metrics.observe_many("feed_lag", updates["received_at"][timed] - updates["time"][timed] / 1000)
+
+    feed = ShardedFeed(subs_list, underlyings, workers, on_updates, **source)
+    routes.extend(route_symbols(states, feed.shard_symbols(shard)) for shard in range(len(feed.shards)))
+    print(f"[DEBUG] Streaming {len(subs_list)} symbols across {len(feed.shards)} worker processes.")
+    feed.start()
+    QApplication.instance().aboutToQuit.connect(feed.close)
     try:
-        await streamer.subscribe(Greeks, subs_list)
-        greeks_events = await asyncio.gather(*[streamer.get_event(Greeks) for _ in subs_list])
-        print(f"[DEBUG] Received {len(greeks_events)} Greeks events.")
-
-        await streamer.subscribe(Quote, subs_list)
-        quotes = await asyncio.gather(*[streamer.get_event(Quote) for _ in subs_list])
-        print(f"[DEBUG] Received {len(quotes)} Quote events.")
+        await feed.wait_closed()
     finally:
-        await streamer.unsubscribe(Greeks, subs_list)
-        await streamer.unsubscribe(Quote, subs_list)
-        await streamer.close()
-
-    greeks_data = [reformat_model(g.__dict__) for g in greeks_events if g]
-    quotes_data = [
-        {
-            "symbol": q.event_symbol,
-            "bid_price": q.bid_price if q.bid_price is not None else "N/A",
-            "ask_price": q.ask_price if q.ask_price is not None else "N/A",
-        }
-        for q in quotes if q
+        feed.close()
+
+
+async def stream_market_data(window, streamer, states, subs_list, archives=None, managers=None):
+    """
+    Consumes the streamer for the life of the app, writes every Greeks and
+    Quote event into the chain state it belongs to and queues the affected row
+    for the next Market Data table refresh.
+    :param states: chain states of every underlying being streamed.
+    :param archives: optional underlying symbol -> TickArchiveWriter that events are also appended to.
+    :param managers: optional underlying symbol -> SubscriptionManager; those chains only
+        stream the contracts in their moneyness window instead of subs_list.
+    """
+    archives = archives or {}
+    managers = managers or {}
+    windowed = {option.streamer_symbol for state in states if state.underlying_symbol in managers
+                for option in state.options if option is not None}
+    full_list = [symbol for symbol in subs_list if symbol not in windowed]
+    if full_list:
+        await streamer.subscribe(Greeks, full_list)
+        await streamer.subscribe(Quote, full_list)
+    underlyings = [state.underlying_symbol for state in states if state.underlying_symbol]
+    if underlyings:
+        # the underlying quote drives the local Black-Scholes Greeks
+        await streamer.subscribe(Quote, underlyings)
+    for manager in managers.values():
+        await manager.start()
+
+    live = not isinstance(streamer, ReplayStreamer)
+
+    def state_for(symbol):
+        for state in states:
+            if symbol in state.index:
+                return state
+        return None
+
+    def on_event(event, update):
+        if metrics.enabled:
+            received = time.time()
+            start = time.perf_counter()
+        state = state_for(event.event_symbol)
+        if state is None:
+            return
+        window.queue_table_row(update(state, event), state)
+        if metrics.enabled:
+            metrics.observe("merge", time.perf_counter() - start)
+            metrics.count("events_" + type(event).__name__.lower())
+            sent = event_time(event) if live else 0
+            if sent:
+                metrics.observe("feed_lag", received - sent)
+        if event.event_symbol == state.underlying_symbol and state.underlying_symbol in managers:
+            managers[state.underlying_symbol].on_underlying()
+        archive = archives.get(state.underlying_symbol)
+        if archive is not None:
+            archive.append(event)
+
+    tasks = [
+        asyncio.create_task(stream_events(
+            streamer, Greeks, lambda g: on_event(g, OptionChainState.update_greeks)
+        )),
+        asyncio.create_task(stream_events(
+            streamer, Quote, lambda q: on_event(q, OptionChainState.update_quote)
+        )),
     ]
-    return greeks_data, quotes_data
-
-
-def prepare_table_data(options, greeks_data, quotes_data):
-    table_data = []
-    for option, greeks, quote in zip(options, greeks_data, quotes_data):
-        if greeks and quote:
-            table_data.append({
-                "event_symbol": option.symbol,
-                "delta": round(greeks.get("delta", 0), 2) if "delta" in greeks else "N/A",
-                "gamma": round(greeks.get("gamma", 0), 2) if "gamma" in greeks else "N/A",
-                "theta": round(greeks.get("theta", 0), 2) if "theta" in greeks else "N/A",
-                "imp_vol": round(greeks.get("volatility", 0), 2) if "volatility" in greeks else "N/A",
-                "vega": round(greeks.get("vega", 0), 2) if "vega" in greeks else "N/A",
-                "rho": round(greeks.get("rho", 0), 2) if "rho" in greeks else "N/A",
-                "bid_price": quote.get("bid_price", "N/A") if "bid_price" in quote else "N/A",
-                "ask_price": quote.get("ask_price", "N/A") if "ask_price" in quote else "N/A",
-            })
-    print(f"[DEBUG] Prepared table data with {len(table_data)} rows.")
-    return table_data
-
-
-
-def display_table_data(window, table_data):
-    if table_data:
-        print("[DEBUG] Populating table with data: {}".format(table_data))
-        window.populate_table(table_data)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        for manager in managers.values():
+            await manager.close()
+
+
+def subscription_managers(window, streamer, states):
+    """
+    Builds a SubscriptionManager per chain from SUBSCRIPTION_STRIKES (strikes on each
+    side of the underlying) and/or SUBSCRIPTION_DELTA (minimum absolute delta, e.g. 0.05);
+    empty when neither is set and every contract is streamed. Contracts with open
+    positions stay subscribed, and rows that leave the window are refreshed once cleared.
+    """
+    strikes = os.getenv("SUBSCRIPTION_STRIKES")
+    min_delta = os.getenv("SUBSCRIPTION_DELTA")
+    if not strikes and not min_delta:
+        return {}
+    delta_band = (float(min_delta), 1.0 - float(min_delta)) if min_delta else None
+    return {
+        state.underlying_symbol: SubscriptionManager(
+            streamer, state, strikes=int(strikes) if strikes else None, delta_band=delta_band,
+            rate=window.risk_free_rate,
+            held_rows=lambda state=state: window.position_book.held_rows(state),
+            on_removed=lambda rows, state=state: [window.queue_table_row(row, state) for row in rows.tolist()],
+        )
+        for state in states if state.underlying_symbol
+    }
+
+
+async def stream_events(streamer, event_type, on_event):
+    """
+    Consumes events of one type from the streamer until cancelled.
+    :param on_event: callback invoked with every event received.
+    """
+    async for event in streamer.listen(event_type):
+        if event:
+            on_event(event)
+
+
+def prepare_table_data(state, options):
+    state.add_options(options)
+    print(f"[DEBUG] Prepared table data with {len(state)} rows.")
+    return state
+
+
+
+def display_table_data(window, state):
+    if len(state):
+        print(f"[DEBUG] Populating table with {len(state)} rows.")
+        window.add_chain_state(state)
     else:
         print("[DEBUG] No data available to display.")
         QMessageBox.warning(window, "No Data", "No data available to display.")
@@ -313,7 +805,12 @@ def main():
 
     window = TastyTraderAPI()
     window.show()
+    app.aboutToQuit.connect(window.save_iv_history)
 
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics.enabled and metrics_port:
+        loop.create_task(serve_prometheus(metrics, int(metrics_port)))
+        print(f"[DEBUG] Serving Prometheus metrics at http://127.0.0.1:{metrics_port}/metrics")
     loop.create_task(fetch_and_display_data(window))
     loop.run_forever()
 
@@ -0,0 +1,260 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Raw per-contract values kept as contiguous float64 columns. Greeks and volatility
+# are stored exactly as dxfeed sends them and only scaled when read for display.
+CHAIN_COLUMNS = [
+    "strike", "expiry", "bid", "ask", "price", "delta", "gamma", "theta", "vega",
+    "rho", "iv", "greeks_time", "model_price", "model_delta", "model_gamma",
+    "model_theta", "model_vega", "model_rho", "model_iv", "iv_rank", "iv_percentile"
+]
+# Contract metadata; every other column is streamed and can go stale
+STATIC_COLUMNS = {"strike", "expiry"}
+GREEKS_FIELDS = {
+    "price": "price", "delta": "delta", "gamma": "gamma", "theta": "theta",
+    "vega": "vega", "rho": "rho", "volatility": "iv", "time": "greeks_time"
+}
+QUOTE_FIELDS = {"bid_price": "bid", "ask_price": "ask"}
+# Display column -> (chain column, scale factor)
+DISPLAY_COLUMNS = {
+    "delta": ("delta", 100.0), "gamma": ("gamma", 100.0), "theta": ("theta", 100.0),
+    "imp_vol": ("iv", 100.0), "vega": ("vega", 100.0), "rho": ("rho", 100.0),
+    "bid_price": ("bid", 1.0), "ask_price": ("ask", 1.0),
+    "iv_rank": ("iv_rank", 1.0), "iv_percentile": ("iv_percentile", 1.0)
+}
+# Where the Greeks shown come from: the dxfeed Greeks events, or the local
+# Black-Scholes engine (greeksEngine.update_model_greeks) writing model_* columns
+GREEKS_SOURCES = ["dxfeed", "model"]
+MODEL_COLUMNS = {"delta", "gamma", "theta", "imp_vol", "vega", "rho"}
+
+
+def contract_key(expiration: Any, strike: Any, option_type: Any) -> Tuple[str, float, str]:
+    """
+    Normalizes a contract description to a hashable key: the expiration as an ISO date
+    string, the strike as a float and the type as "C" or "P" (accepts OptionType,
+    "C"/"P", "call"/"put").
+    """
+    expiration = expiration.isoformat() if hasattr(expiration, "isoformat") else str(expiration)
+    option_type = str(getattr(option_type, "value", option_type)).strip().upper()[:1]
+    return expiration, float(strike), option_type
+
+
+class OptionChainState:
+    """
+    Columnar store for an option chain. Every contract owns one row across a set of
+    contiguous float64 arrays and a streamer symbol -> row index; Greeks and Quote
+    events are written into their row in place. Events can arrive in any order and
+    with partial fields; missing values are NaN and never overwrite known ones.
+    """
+
+    def __init__(self, options: Iterable[Any] = (), capacity: int = 1024,
+                 underlying_symbol: Optional[str] = None):
+        self.index: Dict[str, int] = {}
+        #: contract_key(expiration, strike, type) -> row
+        self.contracts: Dict[Tuple[str, float, str], int] = {}
+        #: streamer symbol whose quote is the underlying price; its row is never listed
+        self.underlying_symbol = underlying_symbol
+        self.greeks_source = "dxfeed"
+        self.streamer_symbols: List[str] = []
+        self.symbols: List[Optional[str]] = []
+        self.options: List[Any] = []
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(capacity, np.nan) for name in CHAIN_COLUMNS
+        }
+        self.is_call = np.zeros(capacity, dtype=bool)
+        self.listed = np.zeros(capacity, dtype=bool)
+        if underlying_symbol:
+            self.row_for(underlying_symbol)
+        self.add_options(options)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.listed[:self.size]))
+
+    def __contains__(self, streamer_symbol: str) -> bool:
+        return streamer_symbol in self.index
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        :return: a view of the live part of a chain column (no copy).
+        """
+        return self.columns[name][:self.size]
+
+    def _grow(self, capacity: int) -> None:
+        for name, column in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        self.is_call = np.concatenate([self.is_call, np.zeros(capacity - len(self.is_call), dtype=bool)])
+        self.listed = np.concatenate([self.listed, np.zeros(capacity - len(self.listed), dtype=bool)])
+
+    def row_for(self, streamer_symbol: str) -> int:
+        """
+        :return: the row owned by a streamer symbol, allocating one if the symbol is new.
+        """
+        row = self.index.get(streamer_symbol)
+        if row is None:
+            if self.size == len(self.is_call):
+                self._grow(max(2 * self.size, 16))
+            row = self.index[streamer_symbol] = self.size
+            self.streamer_symbols.append(streamer_symbol)
+            self.symbols.append(None)
+            self.options.append(None)
+            self.size += 1
+        return row
+
+    def add_options(self, options: Iterable[Any]) -> None:
+        """
+        Registers option contracts with the store. Values already received for a
+        symbol before its metadata are kept.
+        :param options: tastytrade Option objects.
+        """
+        for option in options:
+            row = self.row_for(option.streamer_symbol)
+            self.options[row] = option
+            self.symbols[row] = option.symbol
+            self.listed[row] = True
+            self.columns["strike"][row] = float(option.strike_price)
+            self.is_call[row] = str(getattr(option.option_type, "value", option.option_type)) == "C"
+            expires_at = getattr(option, "expires_at", None)
+            if expires_at is not None:
+                self.columns["expiry"][row] = expires_at.timestamp()
+            expiration_date = getattr(option, "expiration_date", None)
+            if expiration_date is not None:
+                self.contracts[contract_key(expiration_date, option.strike_price, option.option_type)] = row
+
+    def remove_options(self, streamer_symbols: Iterable[str]) -> None:
+        """
+        Unlists contracts that are no longer in the chain. Their rows stay allocated so
+        late events for them are still absorbed, but they are no longer displayed.
+        """
+        for streamer_symbol in streamer_symbols:
+            row = self.index.get(streamer_symbol)
+            if row is not None:
+                self.listed[row] = False
+                option = self.options[row]
+                if option is not None and getattr(option, "expiration_date", None) is not None:
+                    self.contracts.pop(
+                        contract_key(option.expiration_date, option.strike_price, option.option_type), None
+                    )
+
+    def _write(self, streamer_symbol: str, event: Any, fields: Dict[str, str]) -> int:
+        row = self.row_for(streamer_symbol)
+        columns = self.columns
+        for field, name in fields.items():
+            value = getattr(event, field, None)
+            if value is not None:
+                columns[name][row] = value
+        return row
+
+    def update_greeks(self, event: Any) -> int:
+        """
+        Writes a Greeks event into its row in place.
+        :return: the row that was written.
+        """
+        return self._write(event.event_symbol, event, GREEKS_FIELDS)
+
+    def update_quote(self, event: Any) -> int:
+        """
+        Writes a Quote event into its row in place.
+        :return: the row that was written.
+        """
+        return self._write(event.event_symbol, event, QUOTE_FIELDS)
+
+    def write_columns(self, rows: np.ndarray, values: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Writes a batch of updates in place, column by column; NaN values are skipped so
+        partial updates never overwrite known values. When a row appears more than once
+        the last value wins, as if the events had been written one by one.
+        :param rows: store row per update.
+        :param values: chain column -> value per update.
+        :return: the distinct rows written.
+        """
+        for name, column_values in values.items():
+            known = ~np.isnan(column_values)
+            self.columns[name][rows[known]] = column_values[known]
+        return np.unique(rows)
+
+    def clear_rows(self, rows: Iterable[int]) -> None:
+        """
+        Forgets the streamed quotes and Greeks of rows that are no longer subscribed, so
+        their last values are not shown or priced as if they were live.
+        """
+        rows = np.asarray(list(rows), dtype=np.intp)
+        for name in CHAIN_COLUMNS:
+            if name not in STATIC_COLUMNS:
+                self.columns[name][rows] = np.nan
+
+    def find_contract(self, expiration: Any, strike: Any, option_type: Any) -> Optional[int]:
+        """
+        :return: the row of a listed contract in O(1), None if it is not in the chain.
+        """
+        return self.contracts.get(contract_key(expiration, strike, option_type))
+
+    def underlying_price(self) -> float:
+        """
+        :return: mid of the underlying quote, NaN until one has been received.
+        """
+        row = self.index.get(self.underlying_symbol)
+        if row is None:
+            return float("nan")
+        bid, ask = self.columns["bid"][row], self.columns["ask"][row]
+        if bid > 0 and ask > 0:
+            return float(0.5 * (bid + ask))
+        return float("nan")
+
+    def set_greeks_source(self, source: str) -> None:
+        if source not in GREEKS_SOURCES:
+            raise ValueError(f"Unknown Greeks source: {source}")
+        self.greeks_source = source
+
+    def listed_rows(self) -> np.ndarray:
+        """
+        :return: rows that have option metadata, in row order.
+        """
+        return np.flatnonzero(self.listed[:self.size])
+
+    def display_columns(self, rows: Optional[Any] = None, decimals: int = 2) -> Dict[str, np.ndarray]:
+        """
+        Scales and rounds the Greeks and prices for display in one vectorized pass.
+        :param rows: row indices to read; defaults to every listed row.
+        :return: mapping of display column -> float64 array, NaN where no value was received.
+        """
+        if rows is None:
+            rows = self.listed_rows()
+        model = self.greeks_source == "model"
+        return {
+            key: np.round(self.columns["model_" + name if model and key in MODEL_COLUMNS else name][rows] * scale,
+                          decimals)
+            for key, (name, scale) in DISPLAY_COLUMNS.items()
+        }
+
+    def greeks_time(self, row: int) -> Optional[str]:
+        """
+        :return: the ISO-8601 UTC timestamp of the last Greeks event for a row.
+        """
+        timestamp_ms = self.columns["greeks_time"][row]
+        if np.isnan(timestamp_ms):
+            return None
+        return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).isoformat()
+
+    def rows(self, rows: Optional[Any] = None) -> List[Dict[str, Any]]:
+        """
+        Builds display rows (as used by the Market Data table) for the given rows.
+        :param rows: row indices to read; defaults to every listed row.
+        """
+        if rows is None:
+            rows = self.listed_rows()
+        display = self.display_columns(rows)
+        table_data = []
+        for i, row in enumerate(rows):
+            entry = {
+                "event_symbol": self.symbols[row] or self.streamer_symbols[row],
+                "streamer_symbol": self.streamer_symbols[row],
+            }
+            for key, values in display.items():
+                entry[key] = "N/A" if np.isnan(values[i]) else float(values[i])
+            table_data.append(entry)
+        return table_data
@@ -0,0 +1,138 @@
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from marketData import DISPLAY_COLUMNS, OptionChainState
+
+MARKET_DATA_HEADERS = [
+    "Event Symbol", "Delta", "Gamma", "Theta", "Implied Volatility", "Vega", "Rho",
+    "Bid Price", "Ask Price", "IV Rank", "IV Percentile"
+]
+# Past this many changed rows one bounding dataChanged is cheaper than a signal per cell run
+MAX_ROW_SIGNALS = 64
+
+
+class MarketDataModel(QAbstractTableModel):
+    """
+    Read-only table model over an OptionChainState. The view only asks for the rows
+    it is painting, and refresh_rows() emits dataChanged for just the cells whose
+    displayed value changed since the last refresh.
+    """
+
+    def __init__(self, state: Optional[OptionChainState] = None, parent=None):
+        super().__init__(parent)
+        self.state = None
+        self._rows = np.empty(0, dtype=np.intp)
+        self._view_rows = np.empty(0, dtype=np.intp)
+        self._values = np.empty((0, len(DISPLAY_COLUMNS)))
+        if state is not None:
+            self.set_state(state)
+
+    def set_state(self, state: OptionChainState) -> None:
+        """
+        Points the model at a chain store and reloads every row.
+        """
+        self.beginResetModel()
+        self.state = state
+        self._reload()
+        self.endResetModel()
+
+    def _reload(self) -> None:
+        self._rows = self.state.listed_rows()
+        # store row -> view row, -1 for rows the table does not show
+        self._view_rows = np.full(self.state.size, -1, dtype=np.intp)
+        self._view_rows[self._rows] = np.arange(len(self._rows))
+        self._values = self._display_matrix(self._rows)
+
+    def _display_matrix(self, rows: np.ndarray) -> np.ndarray:
+        display = self.state.display_columns(rows)
+        return np.column_stack([display[key] for key in DISPLAY_COLUMNS])
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(MARKET_DATA_HEADERS)
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole) -> Any:
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return MARKET_DATA_HEADERS[section]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole) -> Any:
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column == 0:
+            store_row = self._rows[row]
+            return self.state.symbols[store_row] or self.state.streamer_symbols[store_row]
+        value = self._values[row, column - 1]
+        return "N/A" if np.isnan(value) else str(value)
+
+    def streamer_symbol(self, row: int) -> str:
+        return self.state.streamer_symbols[self._rows[row]]
+
+    def refresh_rows(self, rows: Iterable[int]) -> int:
+        """
+        Re-reads the given store rows and notifies the view about changed cells only
+        (as one bounding range when more than MAX_ROW_SIGNALS rows changed). Rows registered with the store since the last refresh reset the model.
+        :param rows: store row indices that may have changed.
+        :return: number of cells that changed.
+        """
+        if self.state is None:
+            return 0
+        if self.state.size != len(self._view_rows) or len(self.state) != len(self._rows):
+            self.set_state(self.state)
+            return self._values.size
+        view_rows = self._view_rows[np.fromiter(rows, dtype=np.intp)]
+        view_rows = np.unique(view_rows[view_rows >= 0])
+        if not len(view_rows):
+            return 0
+        old = self._values[view_rows]
+        new = self._display_matrix(self._rows[view_rows])
+        changed = ~((old == new) | (np.isnan(old) & np.isnan(new)))
+        self._values[view_rows] = new
+        changed_rows = np.flatnonzero(changed.any(axis=1))
+        if len(changed_rows) > MAX_ROW_SIGNALS:
+            changed_columns = np.flatnonzero(changed.any(axis=0))
+            self.dataChanged.emit(
+                self.index(int(view_rows[changed_rows[0]]), int(changed_columns[0]) + 1),
+                self.index(int(view_rows[changed_rows[-1]]), int(changed_columns[-1]) + 1),
+                [Qt.DisplayRole],
+            )
+            return int(np.count_nonzero(changed))
+        for i in changed_rows:
+            for first, last in _runs(np.flatnonzero(changed[i])):
+                # column 0 is the symbol, display columns start at 1
+                self.dataChanged.emit(
+                    self.index(int(view_rows[i]), first + 1),
+                    self.index(int(view_rows[i]), last + 1),
+                    [Qt.DisplayRole],
+                )
+        return int(np.count_nonzero(changed))
+
+    def refresh_all(self) -> int:
+        """
+        Re-reads every row of the store.
+        :return: number of cells that changed.
+        """
+        if self.state is None:
+            return 0
+        return self.refresh_rows(self._rows)
+
+
+def _runs(columns: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Splits sorted column indices into (first, last) runs of consecutive columns.
+    """
+    runs = []
+    start = prev = int(columns[0])
+    for column in columns[1:]:
+        column = int(column)
+        if column != prev + 1:
+            runs.append((start, prev))
+            start = column
+        prev = column
+    runs.append((start, prev))
+    return runs
@@ -0,0 +1,196 @@
+import bisect
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Histogram bucket upper bounds in seconds: 10us .. 60s on a 1-2.5-5 scale
+LATENCY_BUCKETS = [m * 10.0 ** e for e in range(-5, 2) for m in (1.0, 2.5, 5.0)] + [30.0, 60.0]
+METRIC_PREFIX = "tastytrade_"
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (Prometheus style). observe() is a bisect and two
+    additions, cheap enough to call on every event.
+    """
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def observe_many(self, seconds: np.ndarray) -> None:
+        """
+        Records a batch of observations in one vectorized pass.
+        """
+        if not len(seconds):
+            return
+        counts = np.bincount(np.searchsorted(self.buckets, seconds, side="left"), minlength=len(self.counts))
+        for i, count in enumerate(counts.tolist()):
+            self.counts[i] += count
+        self.count += len(seconds)
+        self.sum += float(seconds.sum())
+        self.max = max(self.max, float(seconds.max()))
+
+    def quantile(self, q: float) -> float:
+        """
+        :return: upper bound of the bucket holding the q-th observation (max for the last bucket).
+        """
+        if not self.count:
+            return float("nan")
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """
+    Counters and latency histograms for the streaming hot path. Call sites check
+    `metrics.enabled` before measuring anything, so a disabled registry costs one
+    attribute lookup per event.
+
+    Example usage::
+
+        if metrics.enabled:
+            start = time.perf_counter()
+        ...
+        if metrics.enabled:
+            metrics.observe("render", time.perf_counter() - start)
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, int] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.help: Dict[str, str] = {}
+        self.started = time.time()
+        self._last_rates: Tuple[float, Dict[str, int]] = (time.monotonic(), {})
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        return cls(enabled=os.getenv("METRICS", "").lower() in ("1", "true", "yes"))
+
+    def describe(self, name: str, text: str) -> None:
+        self.help[name] = text
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    def observe_many(self, name: str, seconds: np.ndarray) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe_many(np.asarray(seconds, dtype=float))
+
+    def rates(self) -> Dict[str, float]:
+        """
+        :return: per-second rate of every counter since the previous call.
+        """
+        now = time.monotonic()
+        last_time, last_counts = self._last_rates
+        elapsed = max(now - last_time, 1e-9)
+        rates = {name: (value - last_counts.get(name, 0)) / elapsed for name, value in self.counters.items()}
+        self._last_rates = (now, dict(self.counters))
+        return rates
+
+    def snapshot(self) -> List[Dict[str, float]]:
+        """
+        :return: one row per histogram with count, mean and p50/p95/p99/max in milliseconds.
+        """
+        rows = []
+        for name, histogram in sorted(self.histograms.items()):
+            rows.append({
+                "name": name,
+                "count": histogram.count,
+                "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else float("nan"),
+                "p50_ms": histogram.quantile(0.5) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "p99_ms": histogram.quantile(0.99) * 1000,
+                "max_ms": histogram.max * 1000,
+            })
+        return rows
+
+    def prometheus_text(self) -> str:
+        """
+        Renders every counter and histogram in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            metric = METRIC_PREFIX + name + "_total"
+            if name in self.help:
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            metric = METRIC_PREFIX + name + "_seconds"
+            if name in self.help:
+                lines.append(f"# HELP {metric} {self.help[name]}")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def event_time(event: Any) -> float:
+    """
+    :return: the dxfeed timestamp of a Greeks (time) or Quote (last bid/ask change)
+        event in epoch seconds, 0 if the event carries none.
+    """
+    timestamp = getattr(event, "time", None) or max(getattr(event, "bid_time", 0) or 0, getattr(event, "ask_time", 0) or 0)
+    return timestamp / 1000
+
+
+async def serve_prometheus(metrics: Metrics, port: int, host: str = "127.0.0.1"):
+    """
+    Serves metrics.prometheus_text() at http://host:port/metrics.
+    :return: the aiohttp runner; call cleanup() on it to stop serving.
+    """
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+#: process-wide registry; enabled with METRICS=1
+metrics = Metrics.from_env()
+metrics.describe("events_greeks", "Greeks events received")
+metrics.describe("events_quote", "Quote events received")
+metrics.describe("feed_lag", "Receive time minus dxfeed event time")
+metrics.describe("merge", "Time to write an event or worker batch into the chain store")
+metrics.describe("transport", "Worker receive time to GUI merge, sharded mode")
+metrics.describe("render", "Market Data refresh frame: Greeks, positions, IV history and table")
+metrics.describe("loop_lag", "Event loop stall beyond the metrics heartbeat interval")
+metrics.describe("chart_frame", "Live P/L chart blit")
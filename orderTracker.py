@@ -0,0 +1,118 @@
+import asyncio
+from collections import defaultdict
+from typing import Any, AsyncIterable, Dict, List, Optional, Tuple
+
+from tastytrade import Account, AlertStreamer
+from tastytrade.order import PlacedOrder
+
+FILLED = "FILLED"
+# Statuses after which an order can no longer fill
+DEAD_STATUSES = {"CANCELLED", "EXPIRED", "REJECTED", "REMOVED", "PARTIALLY_REMOVED"}
+
+
+def _normalize_status(status: Any) -> str:
+    """
+    Maps OrderStatus enums ("Filled") and raw REST/mock strings ("FILLED") to one form.
+    """
+    status = getattr(status, "value", status)
+    return str(status).upper().replace(" ", "_")
+
+
+def _order_fields(update: Any) -> Tuple[str, str]:
+    """
+    :return: (order id, normalized status) from a PlacedOrder or an order dict.
+    """
+    if isinstance(update, dict):
+        return str(update["id"]), _normalize_status(update["status"])
+    return str(update.id), _normalize_status(update.status)
+
+
+class OrderFillTracker:
+    """
+    Tracks the status of every order on the account from one shared stream of order
+    updates, and resolves per-order waiters the moment a fill (or a terminal status)
+    arrives. Any number of concurrent orders share the same connection.
+
+    Example usage::
+
+        tracker = await OrderFillTracker.connect(session)
+        order = await place_limit_order(...)
+        filled = await tracker.wait_for_fill(order['id'], timeout=2)
+    """
+
+    def __init__(self):
+        self.statuses: Dict[str, str] = {}
+        self._waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+        self._task: Optional[asyncio.Task] = None
+        self._streamer = None
+
+    @classmethod
+    async def connect(cls, session, accounts: Optional[List[Account]] = None) -> "OrderFillTracker":
+        """
+        Opens an AlertStreamer subscribed to the account(s) and starts tracking their orders.
+        :param accounts: accounts to follow; defaults to every account of the session.
+        """
+        tracker = cls()
+        streamer = await AlertStreamer(session)
+        if accounts is None:
+            accounts = await asyncio.to_thread(Account.get_accounts, session)
+        await streamer.subscribe_accounts(accounts)
+        tracker._streamer = streamer
+        tracker.start(streamer.listen(PlacedOrder))
+        return tracker
+
+    def start(self, updates: AsyncIterable[Any]) -> None:
+        """
+        Starts consuming order updates. Any async iterable of PlacedOrder objects or
+        {"id": ..., "status": ...} dicts works, e.g. a mock feed in tests.
+        """
+        self._task = asyncio.create_task(self._consume(updates))
+
+    async def _consume(self, updates: AsyncIterable[Any]) -> None:
+        async for update in updates:
+            self.update(*_order_fields(update))
+
+    def update(self, order_id: Any, status: Any) -> None:
+        """
+        Records a status change and wakes the waiters of the order if it is final.
+        """
+        order_id, status = str(order_id), _normalize_status(status)
+        self.statuses[order_id] = status
+        if status == FILLED or status in DEAD_STATUSES:
+            for waiter in self._waiters.pop(order_id, []):
+                if not waiter.done():
+                    waiter.set_result(status == FILLED)
+
+    async def wait_for_fill(self, order_id: Any, timeout: float = 60) -> bool:
+        """
+        :return: True as soon as the order fills, False if it is cancelled/rejected/expired
+            or the timeout passes first.
+        """
+        order_id = str(order_id)
+        status = self.statuses.get(order_id)
+        if status == FILLED:
+            return True
+        if status in DEAD_STATUSES:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[order_id].append(waiter)
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._waiters.get(order_id, []):
+                self._waiters[order_id].remove(waiter)
+                if not self._waiters[order_id]:
+                    del self._waiters[order_id]
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._streamer is not None:
+            await self._streamer.close()
+        for waiters in self._waiters.values():
+            for waiter in waiters:
+                waiter.cancel()
+        self._waiters.clear()
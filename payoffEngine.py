@@ -0,0 +1,135 @@
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+from scipy.special import ndtr
+
+from greeksEngine import MIN_TIME_TO_EXPIRY
+
+CONTRACT_MULTIPLIER = 100
+# Upper bound on grid cells x legs evaluated per chunk, keeps temporaries around 100 MB
+MAX_CHUNK_CELLS = 2_000_000
+
+
+def legs_to_arrays(legs: Iterable[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Converts leg dicts into the column arrays the engine works on.
+    :param legs: dicts with strike, option_type ("C"/"P"), quantity, side ("buy"/"sell"),
+        price (entry premium per share), and optionally iv (0.2 for 20%),
+        time_to_expiry (years) and multiplier.
+    """
+    legs = list(legs)
+    return {
+        "strike": np.array([float(leg["strike"]) for leg in legs]),
+        "is_call": np.array([str(leg["option_type"]).upper().startswith("C") for leg in legs]),
+        "quantity": np.array([
+            float(leg["quantity"]) * (-1 if leg.get("side") == "sell" else 1) for leg in legs
+        ]),
+        "premium": np.array([float(leg.get("price", 0.0)) for leg in legs]),
+        "iv": np.array([float(leg.get("iv", np.nan)) for leg in legs]),
+        "time_to_expiry": np.array([float(leg.get("time_to_expiry", 0.0)) for leg in legs]),
+        "multiplier": np.array([float(leg.get("multiplier", CONTRACT_MULTIPLIER)) for leg in legs]),
+    }
+
+
+def price_grid(spot: float, width: float = 0.1, points: int = 201) -> np.ndarray:
+    """
+    :return: underlying prices spanning spot +/- width (as a fraction of spot).
+    """
+    return np.linspace(spot * (1 - width), spot * (1 + width), points)
+
+
+def expiry_payoff(prices, legs: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    :param prices: underlying prices at expiry, shape (P,).
+    :return: total P/L of the position at each price, shape (P,).
+    """
+    prices = np.asarray(prices, dtype=float)[:, None]
+    intrinsic = np.where(legs["is_call"], np.maximum(prices - legs["strike"], 0.0),
+                         np.maximum(legs["strike"] - prices, 0.0))
+    weights = legs["quantity"] * legs["multiplier"]
+    return (intrinsic - legs["premium"]) @ weights
+
+
+def aggregate_legs(legs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Nets legs on the same contract (strike, type, expiry, IV) into one leg, so a book
+    with repeated fills of the same option is only priced once per contract.
+    :return: arrays with a combined "weight" (quantity x multiplier) per contract and the
+        total premium paid as the scalar "cost".
+    """
+    keys = np.column_stack([legs["strike"], legs["is_call"], legs["time_to_expiry"], legs["iv"]])
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    weights = legs["quantity"] * legs["multiplier"]
+    return {
+        "strike": unique[:, 0],
+        "is_call": unique[:, 1].astype(bool),
+        "time_to_expiry": unique[:, 2],
+        "iv": unique[:, 3],
+        "weight": np.bincount(inverse.ravel(), weights=weights, minlength=len(unique)),
+        "cost": float(legs["premium"] @ weights),
+    }
+
+
+def pnl_surface(prices, days, legs: Dict[str, np.ndarray], iv_shifts=(0.0,), rate: float = 0.0,
+                default_iv: float = 0.2) -> np.ndarray:
+    """
+    Theoretical P/L over a price x time x IV grid, evaluated with Black-Scholes by
+    broadcasting every contract against the whole grid. Only call values are computed;
+    puts follow from put-call parity. Contracts are processed in chunks so hundreds of
+    legs on a fine grid stay within a bounded amount of memory.
+    :param prices: underlying prices, shape (P,).
+    :param days: calendar days from now, shape (T,); legs past expiry are worth intrinsic.
+    :param iv_shifts: absolute IV shifts applied to every leg, shape (V,).
+    :param default_iv: IV for legs without one.
+    :return: P/L array of shape (P, T, V).
+    """
+    prices = np.asarray(prices, dtype=float)
+    days = np.asarray(days, dtype=float)
+    iv_shifts = np.asarray(iv_shifts, dtype=float)
+    surface = np.zeros((len(prices), len(days), len(iv_shifts)))
+    if not len(legs["strike"]):
+        return surface
+    contracts = aggregate_legs({**legs, "iv": np.where(np.isnan(legs["iv"]), default_iv, legs["iv"])})
+    log_prices = np.log(prices)[:, None, None, None]
+    spot = prices[:, None, None, None]
+    chunk = max(1, MAX_CHUNK_CELLS // surface.size)
+    for start in range(0, len(contracts["strike"]), chunk):
+        leg = slice(start, start + chunk)
+        strike, weight = contracts["strike"][leg], contracts["weight"][leg]
+        t = np.maximum(contracts["time_to_expiry"][leg] - days[None, :, None, None] / 365.0, MIN_TIME_TO_EXPIRY)
+        sigma = np.maximum(contracts["iv"][leg] + iv_shifts[None, None, :, None], 1e-4)
+        sigma_sqrt_t = sigma * np.sqrt(t)
+        strike_df = strike * np.exp(-rate * t)
+        d1 = (log_prices - np.log(strike) + rate * t + 0.5 * sigma_sqrt_t ** 2) / sigma_sqrt_t
+        call = spot * ndtr(d1) - strike_df * ndtr(d1 - sigma_sqrt_t)
+        surface += call @ weight
+        # put = call - S + K e^(-rT)
+        put_weight = np.where(contracts["is_call"][leg], 0.0, weight)
+        surface += (strike_df @ put_weight) - spot[..., 0] * put_weight.sum()
+    return surface - contracts["cost"]
+
+
+def breakevens(prices, pnl) -> np.ndarray:
+    """
+    :return: prices where a P/L curve crosses zero, linearly interpolated.
+    """
+    prices, pnl = np.asarray(prices, dtype=float), np.asarray(pnl, dtype=float)
+    crossing = np.flatnonzero(np.sign(pnl[:-1]) * np.sign(pnl[1:]) < 0)
+    left, right = pnl[crossing], pnl[crossing + 1]
+    return prices[crossing] - left * (prices[crossing + 1] - prices[crossing]) / (right - left)
+
+
+def payoff_curves(legs, spot: float, width: float = 0.1, points: int = 201, rate: float = 0.0,
+                  days: Optional[float] = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Everything the Analytics tab plots in one call.
+    :return: prices, expiry P/L and theoretical P/L `days` from now.
+    """
+    arrays = legs_to_arrays(legs) if not isinstance(legs, dict) else legs
+    prices = price_grid(spot, width, points)
+    return {
+        "prices": prices,
+        "expiry": expiry_payoff(prices, arrays),
+        "theoretical": pnl_surface(prices, [days], arrays, rate=rate)[:, 0, 0],
+    }
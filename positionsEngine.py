@@ -0,0 +1,219 @@
+import math
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from greeksEngine import time_to_expiry
+from marketData import OptionChainState
+
+# Portfolio aggregates; Greeks are position exposures (per-share Greek x quantity x multiplier)
+TOTAL_FIELDS = ["market_value", "pnl", "delta", "gamma", "theta", "vega"]
+GREEK_FIELDS = ["delta", "gamma", "theta", "vega"]
+
+
+def _nan_to_zero(value: float) -> float:
+    return 0.0 if math.isnan(value) else value
+
+
+class PositionBook:
+    """
+    Open positions valued against live OptionChainStates, one per underlying. Every
+    position is mapped to the store row that prices it; update_row revalues only the
+    positions on that row and moves the portfolio totals by the difference, so a tick
+    costs O(positions on the contract) rather than a pass over the book. Subscribers are
+    notified in batches from flush, once per UI frame.
+
+    Example usage::
+
+        book = PositionBook.from_positions(account.get_positions(session))
+        book.subscribe(lambda changed, totals: print(totals))
+        book.attach(spx_state)
+        book.attach(spy_state)
+        book.update_row(spx_state.update_quote(quote), spx_state)
+        book.flush()
+    """
+
+    def __init__(self):
+        #: position dicts, in the layout of the Positions tab plus Greek exposures
+        self.positions: List[Dict[str, Any]] = []
+        self.totals: Dict[str, float] = dict.fromkeys(TOTAL_FIELDS, 0.0)
+        #: chain stores the book is priced against, one per underlying
+        self.states: List[OptionChainState] = []
+        #: (state, row) pricing each position, None while no attached store carries it
+        self._rows: List[Optional[Tuple[OptionChainState, int]]] = []
+        self._by_row: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self._dirty: Set[int] = set()
+        self._subscribers: List[Callable[[List[int], Dict[str, float]], None]] = []
+
+    @classmethod
+    def from_positions(cls, positions: Iterable[Any]) -> "PositionBook":
+        """
+        :param positions: tastytrade CurrentPosition objects.
+        """
+        book = cls()
+        for position in positions:
+            quantity = float(position.quantity)
+            if str(position.quantity_direction).lower() == "short":
+                quantity = -quantity
+            book.add_position(
+                position.symbol, quantity, float(position.average_open_price),
+                multiplier=float(position.multiplier), underlying_symbol=position.underlying_symbol
+            )
+        return book
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def add_position(self, symbol: str, quantity: float, avg_price: float, multiplier: float = 100,
+                     streamer_symbol: Optional[str] = None, underlying_symbol: Optional[str] = None) -> int:
+        """
+        :param symbol: OCC option symbol, or the ticker for a stock position.
+        :param quantity: signed quantity, negative for short positions.
+        :param streamer_symbol: dxfeed symbol, when known; otherwise matched on symbol.
+        :return: index of the position.
+        """
+        self.positions.append({
+            "symbol": symbol,
+            "streamer_symbol": streamer_symbol,
+            "underlying_symbol": underlying_symbol,
+            "quantity": quantity,
+            "avg_price": avg_price,
+            "multiplier": multiplier,
+            "current_price": math.nan,
+            "pnl": math.nan,
+            "pnl_percent": math.nan,
+            "market_value": math.nan,
+            **dict.fromkeys(GREEK_FIELDS, math.nan),
+        })
+        self._rows.append(None)
+        index = len(self.positions) - 1
+        if self.states:
+            self._map(index)
+            self._revalue(index)
+        return index
+
+    def attach(self, state: OptionChainState) -> None:
+        """
+        Adds a chain store, replacing the one attached for the same underlying, then
+        maps every position onto the attached stores and revalues the whole book.
+        Positions on contracts no store carries stay unpriced.
+        """
+        self.states = [
+            attached for attached in self.states
+            if attached is not state and attached.underlying_symbol != state.underlying_symbol
+        ] + [state]
+        self._by_row.clear()
+        self.totals = dict.fromkeys(TOTAL_FIELDS, 0.0)
+        for position in self.positions:
+            position.update(dict.fromkeys(TOTAL_FIELDS, math.nan))
+        for index in range(len(self.positions)):
+            self._map(index)
+            self._revalue(index)
+
+    def _map(self, index: int) -> None:
+        position = self.positions[index]
+        self._rows[index] = None
+        for state in self.states:
+            row = state.index.get(position["streamer_symbol"] or position["symbol"])
+            if row is None and position["symbol"] in state.symbols:
+                row = state.symbols.index(position["symbol"])
+            if row is not None:
+                self._rows[index] = (state, row)
+                self._by_row[(id(state), row)].append(index)
+                return
+
+    def update_row(self, row: int, state: OptionChainState) -> None:
+        """
+        Revalues the positions priced by a store row after an event was written into it.
+        """
+        for index in self._by_row.get((id(state), row), ()):
+            self._revalue(index)
+
+    def update_rows(self, rows: Iterable[int], state: OptionChainState) -> None:
+        for row in rows:
+            self.update_row(row, state)
+
+    def held_rows(self, state: OptionChainState) -> List[int]:
+        """
+        :return: rows of a store that price at least one position.
+        """
+        return sorted({mapped[1] for mapped in self._rows if mapped is not None and mapped[0] is state})
+
+    def _revalue(self, index: int) -> None:
+        position, mapped = self.positions[index], self._rows[index]
+        if mapped is None:
+            return
+        state, row = mapped
+        columns = state.columns
+        is_underlying = state.streamer_symbols[row] == state.underlying_symbol
+        bid, ask = columns["bid"][row], columns["ask"][row]
+        mark = 0.5 * (bid + ask) if bid > 0 and ask > 0 else columns["price"][row]
+        size = position["quantity"] * position["multiplier"]
+        prefix = "model_" if state.greeks_source == "model" and not is_underlying else ""
+
+        values = {
+            "market_value": mark * size,
+            "pnl": (mark - position["avg_price"]) * size,
+        }
+        for greek in GREEK_FIELDS:
+            if is_underlying:
+                values[greek] = size if greek == "delta" else 0.0
+            else:
+                values[greek] = columns[prefix + greek][row] * size
+        for field in TOTAL_FIELDS:
+            self.totals[field] += _nan_to_zero(values[field]) - _nan_to_zero(position[field])
+        position.update(values)
+        position["current_price"] = mark
+        cost = abs(position["avg_price"] * size)
+        position["pnl_percent"] = values["pnl"] / cost * 100 if cost else math.nan
+        self._dirty.add(index)
+
+    def subscribe(self, callback: Callable[[List[int], Dict[str, float]], None]) -> None:
+        """
+        :param callback: called from flush with the indices of the positions that changed
+            and the portfolio totals.
+        """
+        self._subscribers.append(callback)
+
+    def flush(self) -> None:
+        """
+        Notifies subscribers of the positions revalued since the last flush.
+        """
+        if not self._dirty:
+            return
+        changed, self._dirty = sorted(self._dirty), set()
+        for callback in self._subscribers:
+            callback(changed, self.totals)
+
+    def payoff_legs(self, state: Optional[OptionChainState] = None,
+                    now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        :param state: only return the positions priced by this store (one underlying);
+            legs of different underlyings don't belong on one payoff diagram.
+        :param now: epoch seconds the time to expiry is measured from; defaults to now.
+        :return: option positions as payoffEngine leg dicts, with the live IV and time
+            to expiry of their contract.
+        """
+        legs = []
+        for position, mapped in zip(self.positions, self._rows):
+            if mapped is None or (state is not None and mapped[0] is not state):
+                continue
+            owner, row = mapped
+            if owner.options[row] is None:
+                continue
+            iv_column = "model_iv" if owner.greeks_source == "model" else "iv"
+            leg = {
+                "strike": owner.columns["strike"][row],
+                "option_type": "C" if owner.is_call[row] else "P",
+                "quantity": abs(position["quantity"]),
+                "side": "sell" if position["quantity"] < 0 else "buy",
+                "price": position["avg_price"],
+                "multiplier": position["multiplier"],
+            }
+            iv = owner.columns[iv_column][row]
+            if not math.isnan(iv):
+                leg["iv"] = iv
+            expiry = owner.columns["expiry"][row]
+            if not math.isnan(expiry):
+                leg["time_to_expiry"] = float(time_to_expiry(expiry, now))
+            legs.append(leg)
+        return legs
@@ -0,0 +1,84 @@
+from typing import Callable, Dict, Hashable, Iterable, Set
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+
+class RefreshScheduler(QObject):
+    """
+    Coalesces streamed updates between the chain store and the UI. Rows are marked
+    dirty as events arrive and flushed to the view at most rate_hz times a second;
+    a row marked again before the next flush is coalesced: the store already holds
+    every value written, so the row is painted once with all of them and nothing is
+    lost. Rows can be any hashable key, e.g. (chain state, store row) when several
+    chains share one scheduler.
+    """
+
+    #: emitted after every flush with the scheduler stats
+    flushed = Signal(dict)
+
+    def __init__(self, flush: Callable[[Iterable[Hashable]], object], rate_hz: float = 20.0, parent=None):
+        super().__init__(parent)
+        self._flush = flush
+        self._dirty: Set[Hashable] = set()
+        self.received = 0
+        self.coalesced = 0
+        self.flushes = 0
+        self.max_queue_depth = 0
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate_hz)
+
+    def set_rate(self, rate_hz: float) -> None:
+        """
+        Changes the flush frequency.
+        :param rate_hz: flushes per second, e.g. 10-30.
+        """
+        if rate_hz <= 0:
+            raise ValueError(f"Refresh rate must be positive: {rate_hz}")
+        self.rate_hz = rate_hz
+        self._timer.setInterval(max(1, int(1000 / rate_hz)))
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._dirty)
+
+    def mark_dirty(self, row: Hashable) -> None:
+        """
+        Queues a store row for the next flush.
+        """
+        self.received += 1
+        if row in self._dirty:
+            self.coalesced += 1
+            return
+        self._dirty.add(row)
+        if len(self._dirty) > self.max_queue_depth:
+            self.max_queue_depth = len(self._dirty)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self) -> None:
+        """
+        Pushes every dirty row to the view in one batch. The timer stops once there
+        is nothing left to flush and restarts on the next mark_dirty().
+        """
+        if not self._dirty:
+            self._timer.stop()
+            return
+        rows, self._dirty = self._dirty, set()
+        self._flush(rows)
+        self.flushes += 1
+        self.flushed.emit(self.stats())
+
+    def stop(self) -> None:
+        self._timer.stop()
+        self._dirty.clear()
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "rate_hz": self.rate_hz,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "received": self.received,
+            "coalesced": self.coalesced,
+            "flushes": self.flushes,
+        }
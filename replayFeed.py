@@ -0,0 +1,269 @@
+import asyncio
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple, Type
+
+from tastytrade.dxfeed import Greeks, Quote
+from tastytrade.instruments import Option
+
+# combined_data.json stores Greeks and volatility the way reformat_model shows them
+# (multiplied by 100); replayed events carry the raw dxfeed values.
+RECORDED_SCALE = 100.0
+SCALED_GREEKS = ["volatility", "delta", "gamma", "theta", "rho", "vega"]
+QUOTE_RECORD_FIELDS = ["bid_price", "bid_size", "ask_price", "ask_size"]
+
+
+def _time_ms(value: Any) -> int:
+    """
+    Converts a recorded timestamp (epoch milliseconds or ISO-8601 string) to epoch milliseconds.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = value[:-1] if value.endswith("Z") else value
+    dt = datetime.fromisoformat(text)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def greeks_from_record(record: Dict[str, Any]) -> Greeks:
+    values = {key: record.get(key) for key in ["price"] + SCALED_GREEKS}
+    for key in SCALED_GREEKS:
+        if values[key] is not None:
+            values[key] = values[key] / RECORDED_SCALE
+    return Greeks.model_construct(
+        event_symbol=record["event_symbol"],
+        event_time=record.get("event_time", 0),
+        event_flags=record.get("event_flags", 0),
+        index=record.get("index", 0),
+        time=_time_ms(record.get("time")),
+        sequence=record.get("sequence", 0),
+        **values,
+    )
+
+
+def greeks_to_record(event: Greeks) -> Dict[str, Any]:
+    record = {
+        "event_symbol": event.event_symbol,
+        "event_time": event.event_time,
+        "event_flags": event.event_flags,
+        "index": event.index,
+        "time": datetime.fromtimestamp(event.time / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "sequence": event.sequence,
+        "price": None if event.price is None else float(event.price),
+    }
+    for key in SCALED_GREEKS:
+        value = getattr(event, key)
+        record[key] = None if value is None else float(value) * RECORDED_SCALE
+    return record
+
+
+def quote_from_record(record: Dict[str, Any]) -> Quote:
+    return Quote.model_construct(
+        event_symbol=record.get("event_symbol", record.get("symbol")),
+        event_time=record.get("event_time", 0),
+        **{key: record.get(key) for key in QUOTE_RECORD_FIELDS},
+    )
+
+
+def quote_to_record(event: Quote) -> Dict[str, Any]:
+    record = {"symbol": event.event_symbol}
+    for key in QUOTE_RECORD_FIELDS:
+        value = getattr(event, key, None)
+        record[key] = None if value is None else float(value)
+    return record
+
+
+def load_recording(path: str) -> Tuple[List[Option], List[Tuple[float, Any]]]:
+    """
+    Reads a recording in the combined_data.json format: a list of records, each with an
+    "option" and optionally a "greeks" and/or "quote" entry. Entries may carry a
+    "received_at" epoch-seconds timestamp (written by SessionRecorder); otherwise the
+    Greeks event time of the record is used.
+    :return: the distinct options and the (timestamp, event) pairs sorted by time.
+    """
+    with open(path) as file:
+        records = json.load(file)
+
+    options: Dict[str, Option] = {}
+    events: List[Tuple[float, Any]] = []
+    for record in records:
+        if record.get("option"):
+            option = Option(**record["option"])
+            options.setdefault(option.streamer_symbol, option)
+        greeks = record.get("greeks")
+        record_time = _time_ms(greeks.get("time")) / 1000 if greeks else 0.0
+        if greeks:
+            events.append((greeks.get("received_at", record_time), greeks_from_record(greeks)))
+        quote = record.get("quote")
+        if quote:
+            events.append((quote.get("received_at", record_time), quote_from_record(quote)))
+    events.sort(key=lambda pair: pair[0])
+    return list(options.values()), events
+
+
+class ReplayStreamer:
+    """
+    Drop-in stand-in for DXLinkStreamer that plays back a recorded session. Playback
+    starts when the first consumer reads an event, and only events for subscribed
+    symbols are delivered. Like DXLink, subscribing a symbol delivers the last event
+    already played for it.
+
+    Example usage::
+
+        async with ReplayStreamer("combined_data.json", speed=None) as streamer:
+            await streamer.subscribe(Greeks, [o.streamer_symbol for o in streamer.options])
+            async for greeks in streamer.listen(Greeks):
+                print(greeks)
+    """
+
+    def __init__(self, path: str = "combined_data.json", speed: Optional[float] = 1.0, loops: int = 1):
+        """
+        :param path: recording to play back.
+        :param speed: playback rate relative to the original timing (2.0 is twice as fast);
+            None or 0 replays as fast as possible.
+        :param loops: number of times to play the recording back to back.
+        """
+        self.options, self._events = load_recording(path)
+        self.speed = speed
+        self.loops = loops
+        self.finished = asyncio.Event()
+        self._queues: Dict[Type, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self._subscriptions: Dict[Type, Set[str]] = defaultdict(set)
+        #: event type -> symbol -> last event played, subscribed or not
+        self._latest: Dict[Type, Dict[str, Any]] = defaultdict(dict)
+        self._task: Optional[asyncio.Task] = None
+        #: recording time (epoch seconds) of the last event played, the replay's "now"
+        self.current_time: Optional[float] = self._events[0][0] if self._events else None
+
+    async def __aenter__(self):
+        return self
+
+    def __await__(self):
+        return self.__aenter__().__await__()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._play())
+
+    async def _play(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first = self._events[0][0] if self._events else 0.0
+        span = (self._events[-1][0] - first) if self._events else 0.0
+        for n in range(self.loops):
+            for i, (timestamp, event) in enumerate(self._events):
+                if self.speed:
+                    delay = (n * span + timestamp - first) / self.speed - (loop.time() - start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif i % 256 == 0:
+                    # yield so consumers (and the Qt loop) keep up in as-fast-as-possible mode
+                    await asyncio.sleep(0)
+                self.current_time = timestamp
+                self._latest[type(event)][event.event_symbol] = event
+                if event.event_symbol in self._subscriptions[type(event)]:
+                    self._queues[type(event)].put_nowait(event)
+        self.finished.set()
+
+    def clock(self) -> Optional[float]:
+        """
+        :return: the recording time reached, for pricing against the session's clock.
+        """
+        return self.current_time
+
+    async def subscribe(self, event_class: Type, symbols: List[str]) -> None:
+        subscribed, latest = self._subscriptions[event_class], self._latest[event_class]
+        for symbol in symbols:
+            if symbol not in subscribed and symbol in latest:
+                self._queues[event_class].put_nowait(latest[symbol])
+        subscribed.update(symbols)
+
+    async def unsubscribe(self, event_class: Type, symbols: List[str]) -> None:
+        self._subscriptions[event_class].difference_update(symbols)
+
+    async def unsubscribe_all(self, event_class: Type) -> None:
+        self._subscriptions[event_class].clear()
+
+    async def listen(self, event_class: Type) -> AsyncIterator[Any]:
+        self._start()
+        while True:
+            yield await self._queues[event_class].get()
+
+    async def get_event(self, event_class: Type) -> Any:
+        self._start()
+        return await self._queues[event_class].get()
+
+    def get_event_nowait(self, event_class: Type) -> Optional[Any]:
+        self._start()
+        try:
+            return self._queues[event_class].get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+    async def close(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class SessionRecorder:
+    """
+    Wraps a live streamer and captures every Greeks and Quote event read through it,
+    so the session can be saved in the combined_data.json format and replayed later
+    with ReplayStreamer.
+    """
+
+    def __init__(self, streamer: Any, options: List[Option] = ()):
+        self.streamer = streamer
+        self.records: List[Dict[str, Any]] = []
+        self._options = {
+            option.streamer_symbol: option.model_dump(mode="json") for option in options
+        }
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def record(self, event: Any) -> None:
+        if isinstance(event, Greeks):
+            key, entry = "greeks", greeks_to_record(event)
+        elif isinstance(event, Quote):
+            key, entry = "quote", quote_to_record(event)
+        else:
+            return
+        entry["received_at"] = time.time()
+        self.records.append({"option": self._options.get(event.event_symbol), key: entry})
+
+    async def subscribe(self, event_class: Type, symbols: List[str]) -> None:
+        await self.streamer.subscribe(event_class, symbols)
+
+    async def unsubscribe(self, event_class: Type, symbols: List[str]) -> None:
+        await self.streamer.unsubscribe(event_class, symbols)
+
+    async def listen(self, event_class: Type) -> AsyncIterator[Any]:
+        async for event in self.streamer.listen(event_class):
+            self.record(event)
+            yield event
+
+    async def get_event(self, event_class: Type) -> Any:
+        event = await self.streamer.get_event(event_class)
+        self.record(event)
+        return event
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.records, file, indent=4)
+        print(f"[DEBUG] Recorded {len(self.records)} events to {path}.")
+
+    async def close(self) -> None:
+        await self.streamer.close()
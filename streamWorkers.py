@@ -0,0 +1,247 @@
+"""
+Sharded streaming across worker processes.
+
+Each worker owns its own DXLinkStreamer (or ReplayStreamer) for a slice of the
+streamer symbols, decodes the events, and sends them to the GUI process over a pipe
+as compact NumPy record batches (UPDATE_DTYPE). The GUI process only copies the
+batches into the chain stores, so decoding scales with the number of workers.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from tastytrade import DXLinkStreamer
+from tastytrade.dxfeed import Greeks, Quote
+
+QUOTE, GREEKS = 0, 1
+UPDATE_DTYPE = np.dtype([
+    ("symbol", "<u4"), ("kind", "u1"), ("received_at", "<f8"), ("time", "<f8"),
+    ("bid", "<f8"), ("ask", "<f8"), ("price", "<f8"), ("delta", "<f8"), ("gamma", "<f8"),
+    ("theta", "<f8"), ("vega", "<f8"), ("rho", "<f8"), ("iv", "<f8"),
+])
+# update field -> chain store column; NaN fields are not written
+STORE_COLUMNS = {
+    "bid": "bid", "ask": "ask", "price": "price", "delta": "delta", "gamma": "gamma",
+    "theta": "theta", "vega": "vega", "rho": "rho", "iv": "iv", "time": "greeks_time",
+}
+NAN = float("nan")
+
+
+def streamer_credentials(session) -> Dict[str, Any]:
+    """
+    The part of a Session a DXLinkStreamer needs, in a form that can be sent to a worker.
+    """
+    return {"dxlink_url": session.dxlink_url, "streamer_token": session.streamer_token, "proxy": session.proxy}
+
+
+def _value(value: Any) -> float:
+    return NAN if value is None else float(value)
+
+
+def pack_greeks(symbol_id: int, event: Any, received_at: float) -> Tuple:
+    return (
+        symbol_id, GREEKS, received_at, _value(event.time), NAN, NAN, _value(event.price),
+        _value(event.delta), _value(event.gamma), _value(event.theta), _value(event.vega),
+        _value(event.rho), _value(event.volatility),
+    )
+
+
+def pack_quote(symbol_id: int, event: Any, received_at: float) -> Tuple:
+    return (
+        symbol_id, QUOTE, received_at, NAN, _value(event.bid_price), _value(event.ask_price),
+        NAN, NAN, NAN, NAN, NAN, NAN, NAN,
+    )
+
+
+def run_worker(symbols: List[str], quote_symbols: List[str], conn, credentials: Optional[Dict[str, Any]] = None,
+               replay_path: Optional[str] = None, replay_speed: float = 1.0, batch_interval: float = 0.02) -> None:
+    """
+    Worker process entry point; streams until the GUI end of the pipe goes away.
+    :param symbols: streamer symbols to subscribe Greeks and Quote for.
+    :param quote_symbols: symbols to subscribe Quote only for (underlyings).
+        Update symbol ids index into symbols + quote_symbols.
+    """
+    try:
+        asyncio.run(_stream_shard(symbols, quote_symbols, conn, credentials, replay_path, replay_speed, batch_interval))
+    except (BrokenPipeError, EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        conn.close()
+
+
+async def _stream_shard(symbols, quote_symbols, conn, credentials, replay_path, replay_speed, batch_interval):
+    ids = {symbol: i for i, symbol in enumerate(list(symbols) + list(quote_symbols))}
+    pending: List[Tuple] = []
+    if replay_path:
+        from replayFeed import ReplayStreamer
+        streamer = ReplayStreamer(replay_path, speed=replay_speed)
+    else:
+        streamer = await DXLinkStreamer(SimpleNamespace(**credentials))
+
+    async def consume(event_type, pack):
+        async for event in streamer.listen(event_type):
+            symbol_id = ids.get(event.event_symbol)
+            if symbol_id is not None:
+                pending.append(pack(symbol_id, event, time.time()))
+
+    async def publish():
+        nonlocal pending
+        while True:
+            await asyncio.sleep(batch_interval)
+            if pending:
+                batch, pending = pending, []
+                conn.send_bytes(np.array(batch, dtype=UPDATE_DTYPE).tobytes())
+
+    try:
+        await streamer.subscribe(Greeks, list(symbols))
+        await streamer.subscribe(Quote, list(symbols) + list(quote_symbols))
+        tasks = [
+            asyncio.create_task(consume(Greeks, pack_greeks)),
+            asyncio.create_task(consume(Quote, pack_quote)),
+            asyncio.create_task(publish()),
+        ]
+        try:
+            # the publisher raises once the GUI closes its end of the pipe
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+    finally:
+        await streamer.close()
+
+
+def route_symbols(states: Sequence[Any], symbols: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Maps streamer symbols to their chain store.
+    :return: (store index into states, row in that store) per symbol; -1 if no store has it.
+    """
+    state_ids = np.full(len(symbols), -1, dtype=np.intp)
+    rows = np.full(len(symbols), -1, dtype=np.intp)
+    for i, symbol in enumerate(symbols):
+        for state_id, state in enumerate(states):
+            row = state.index.get(symbol)
+            if row is not None:
+                state_ids[i], rows[i] = state_id, row
+                break
+    return state_ids, rows
+
+
+def apply_updates(states: Sequence[Any], route: Tuple[np.ndarray, np.ndarray],
+                  updates: np.ndarray) -> Dict[int, np.ndarray]:
+    """
+    Writes a batch of worker updates into the chain stores.
+    :return: store index -> rows written.
+    """
+    state_ids, rows = route[0][updates["symbol"]], route[1][updates["symbol"]]
+    written = {}
+    for state_id in np.unique(state_ids):
+        if state_id < 0:
+            continue
+        mask = state_ids == state_id
+        written[int(state_id)] = states[state_id].write_columns(
+            rows[mask], {column: updates[field][mask] for field, column in STORE_COLUMNS.items()}
+        )
+    return written
+
+
+class ShardedFeed:
+    """
+    Starts one worker process per shard and hands every batch they publish to
+    on_updates(shard, updates) on the asyncio loop. A reader thread per pipe keeps the
+    blocking reads off the loop.
+
+    Example usage::
+
+        feed = ShardedFeed(symbols, ["SPX"], 4, on_updates, credentials=streamer_credentials(session))
+        feed.start()
+        await feed.wait_closed()
+    """
+
+    def __init__(self, symbols: Sequence[str], quote_symbols: Sequence[str], workers: int,
+                 on_updates: Callable[[int, np.ndarray], None], **source):
+        """
+        :param source: credentials=streamer_credentials(session) for the live feed, or
+            replay_path / replay_speed to shard a recording.
+        """
+        workers = max(1, min(workers, len(symbols) or 1))
+        self.on_updates = on_updates
+        self.source = source
+        # options and underlyings are dealt round-robin, so shards stay within one symbol of each other
+        self.shards = [
+            (list(symbols[i::workers]), list(quote_symbols[i::workers])) for i in range(workers)
+        ]
+        self.received = [0] * workers
+        self._processes: List[multiprocessing.Process] = []
+        self._connections = []
+        self._threads: List[threading.Thread] = []
+        self._closed: Optional[asyncio.Event] = None
+        # readers that have seen their worker stop; the last one sets _closed
+        self._finished = 0
+        self._finished_lock = threading.Lock()
+
+    def shard_symbols(self, shard: int) -> List[str]:
+        """
+        :return: the symbols of a shard in update symbol id order.
+        """
+        symbols, quote_symbols = self.shards[shard]
+        return symbols + quote_symbols
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._closed = asyncio.Event()
+        # spawn, not fork: the GUI process has Qt and a running event loop
+        context = multiprocessing.get_context("spawn")
+        for shard, (symbols, quote_symbols) in enumerate(self.shards):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=run_worker, args=(symbols, quote_symbols, sender), kwargs=self.source,
+                name=f"stream-shard-{shard}", daemon=True,
+            )
+            process.start()
+            sender.close()
+            thread = threading.Thread(target=self._read, args=(loop, shard, receiver), daemon=True)
+            thread.start()
+            self._processes.append(process)
+            self._connections.append(receiver)
+            self._threads.append(thread)
+
+    def _read(self, loop, shard: int, receiver) -> None:
+        try:
+            while True:
+                updates = np.frombuffer(receiver.recv_bytes(), dtype=UPDATE_DTYPE)
+                self.received[shard] += len(updates)
+                loop.call_soon_threadsafe(self.on_updates, shard, updates)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._finished_lock:
+                self._finished += 1
+                last = self._finished == len(self.shards)
+            if last:
+                try:
+                    loop.call_soon_threadsafe(self._closed.set)
+                except RuntimeError:
+                    # the loop is already closed when the app is shutting down
+                    pass
+
+    async def wait_closed(self) -> None:
+        """
+        Waits until every worker has stopped.
+        """
+        await self._closed.wait()
+
+    def close(self) -> None:
+        for process in self._processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            process.join(timeout=2)
+        # the readers see EOF once their worker is gone
+        for thread in self._threads:
+            thread.join(timeout=2)
+        for receiver in self._connections:
+            receiver.close()
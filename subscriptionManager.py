@@ -0,0 +1,182 @@
+import asyncio
+import math
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from tastytrade.dxfeed import Greeks, Quote
+
+from greeksEngine import black_scholes_greeks, implied_underlying, time_to_expiry
+from marketData import OptionChainState
+
+DEFAULT_IV = 0.2
+
+
+class SubscriptionManager:
+    """
+    Keeps the streamer subscribed to the contracts near the money of one chain only: a
+    window of strikes around the underlying price and/or a band of absolute delta. As
+    the underlying moves the window is shifted by subscribing the contracts that enter it
+    and unsubscribing the ones that leave, instead of streaming the whole chain.
+    Contracts that leave have their streamed values cleared; contracts returned by
+    held_rows (open positions) are always kept subscribed.
+
+    Example usage::
+
+        manager = SubscriptionManager(streamer, state, strikes=20)
+        await manager.start()
+        # on every underlying quote
+        manager.on_underlying()
+    """
+
+    def __init__(self, streamer, state: OptionChainState, strikes: Optional[int] = None,
+                 delta_band: Optional[Tuple[float, float]] = None, rate: float = 0.0,
+                 min_shift: float = 0.5, bootstrap_timeout: float = 5.0,
+                 held_rows: Optional[Callable[[], Iterable[int]]] = None,
+                 on_removed: Optional[Callable[[np.ndarray], None]] = None):
+        """
+        :param strikes: number of strikes to keep on each side of the underlying price.
+        :param delta_band: (low, high) bounds on absolute delta, e.g. (0.05, 0.95); the delta
+            is the Black-Scholes delta at the last known (or chain median) IV.
+        :param min_shift: move of the underlying, in strike steps, before the window is rechecked.
+        :param bootstrap_timeout: seconds to wait for an underlying quote before falling back
+            to the full chain until a price can be implied from the option quotes.
+        :param held_rows: returns the store rows to keep subscribed whatever the window,
+            e.g. the contracts of open positions.
+        :param on_removed: called with the rows that were unsubscribed and cleared.
+        """
+        if strikes is None and delta_band is None:
+            raise ValueError("SubscriptionManager needs a strike window or a delta band")
+        self.streamer = streamer
+        self.state = state
+        self.strikes = strikes
+        self.delta_band = delta_band
+        self.rate = rate
+        self.min_shift = min_shift
+        self.bootstrap_timeout = bootstrap_timeout
+        self.held_rows = held_rows
+        self.on_removed = on_removed
+        self.subscribed: Set[str] = set()
+        self.center: Optional[float] = None
+        self.shifts = 0
+        self._task: Optional[asyncio.Task] = None
+        self._bootstrap_task: Optional[asyncio.Task] = None
+        self._step: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        """
+        Subscribes the underlying quote and the initial window (once the price is known).
+        """
+        if self.state.underlying_symbol:
+            await self.streamer.subscribe(Quote, [self.state.underlying_symbol])
+        spot = self.state.underlying_price()
+        if math.isnan(spot):
+            self._bootstrap_task = asyncio.create_task(self._bootstrap())
+        else:
+            await self.shift(spot)
+
+    async def _bootstrap(self) -> None:
+        await asyncio.sleep(self.bootstrap_timeout)
+        if self.center is not None:
+            return
+        print(f"[DEBUG] No {self.state.underlying_symbol} quote yet; subscribing the full chain until a price is implied.")
+        await self._apply({self.state.streamer_symbols[row] for row in self.state.listed_rows()})
+        while self.center is None:
+            # the full chain's quotes start arriving right away; check again soon
+            await asyncio.sleep(min(1.0, self.bootstrap_timeout))
+            spot = implied_underlying(self.state)
+            if not math.isnan(spot):
+                await self.shift(spot)
+
+    def strike_step(self) -> float:
+        if self._step is None:
+            strikes = np.unique(self.state.column("strike")[self.state.listed_rows()])
+            self._step = float(np.median(np.diff(strikes))) if len(strikes) > 1 else 0.0
+        return self._step
+
+    def target_rows(self, spot: float) -> np.ndarray:
+        """
+        :return: the listed rows that belong in the window for an underlying price.
+        """
+        state = self.state
+        rows = state.listed_rows()
+        strike = state.columns["strike"][rows]
+        keep = np.ones(len(rows), dtype=bool)
+        if self.strikes is not None:
+            strikes = np.unique(strike)
+            i = np.searchsorted(strikes, spot)
+            low = strikes[max(0, i - self.strikes)]
+            high = strikes[min(len(strikes) - 1, i + self.strikes - 1)]
+            keep &= (strike >= low) & (strike <= high)
+        if self.delta_band is not None:
+            iv = state.columns["iv"][rows]
+            known = iv[~np.isnan(iv)]
+            iv = np.where(np.isnan(iv), np.median(known) if len(known) else DEFAULT_IV, iv)
+            delta = black_scholes_greeks(
+                spot, strike, time_to_expiry(state.columns["expiry"][rows]), iv, state.is_call[rows], self.rate
+            )["delta"]
+            # contracts without an expiry cannot be priced; keep them rather than drop them
+            delta = np.where(np.isnan(delta), 0.5, np.abs(delta))
+            keep &= (delta >= self.delta_band[0]) & (delta <= self.delta_band[1])
+        return rows[keep]
+
+    def on_underlying(self) -> None:
+        """
+        Call on every underlying quote; shifts the window in the background once the
+        price has moved min_shift strike steps from the current center.
+        """
+        spot = self.state.underlying_price()
+        if math.isnan(spot) or (self._task is not None and not self._task.done()):
+            return
+        if self.center is not None and abs(spot - self.center) < self.min_shift * self.strike_step():
+            return
+        self._task = asyncio.create_task(self.shift(spot))
+
+    async def refresh(self) -> None:
+        """
+        Recomputes the window after contracts were added to or removed from the chain.
+        """
+        self._step = None
+        spot = self.state.underlying_price() if self.center is None else self.center
+        if not math.isnan(spot):
+            await self.shift(spot)
+
+    async def shift(self, spot: float) -> Tuple[List[str], List[str]]:
+        """
+        Moves the window to an underlying price.
+        :return: symbols subscribed and unsubscribed.
+        """
+        self.center = spot
+        symbols = self.state.streamer_symbols
+        return await self._apply({symbols[row] for row in self.target_rows(spot)})
+
+    async def _apply(self, target: Set[str]) -> Tuple[List[str], List[str]]:
+        async with self._lock:
+            if self.held_rows is not None:
+                symbols = self.state.streamer_symbols
+                target = target | {symbols[row] for row in self.held_rows()}
+            added = sorted(target - self.subscribed)
+            removed = sorted(self.subscribed - target)
+            if removed:
+                await self.streamer.unsubscribe(Greeks, removed)
+                await self.streamer.unsubscribe(Quote, removed)
+                rows = np.array([self.state.index[symbol] for symbol in removed], dtype=np.intp)
+                self.state.clear_rows(rows)
+                if self.on_removed is not None:
+                    self.on_removed(rows)
+            if added:
+                await self.streamer.subscribe(Greeks, added)
+                await self.streamer.subscribe(Quote, added)
+            self.subscribed = target
+            if added or removed:
+                self.shifts += 1
+                where = "full chain" if self.center is None else f"window at {self.center:.2f}"
+                print(f"[DEBUG] {self.state.underlying_symbol} {where}: "
+                      f"+{len(added)} -{len(removed)}, {len(target)} contracts subscribed.")
+            return added, removed
+
+    async def close(self) -> None:
+        tasks = [task for task in (self._task, self._bootstrap_task) if task is not None and not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
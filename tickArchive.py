@@ -0,0 +1,303 @@
+"""
+Append-only tick archive for streamed Quote and Greeks events.
+
+Each trading date / underlying gets a directory holding one raw little-endian file
+per column, so a column can be memory-mapped straight into a NumPy array, plus a
+symbols.txt that maps the symbol ids of the "symbol" column to streamer symbols.
+Greeks are stored raw, as dxfeed sends them.
+
+    python tickArchive.py import combined_data.json
+    python tickArchive.py info SPX 2025-04-10
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tastytrade", "ticks")
+QUOTE, GREEKS = 0, 1
+TICK_COLUMNS: Dict[str, np.dtype] = {
+    "received_at": np.dtype("<f8"),  # epoch seconds
+    "event_time": np.dtype("<i8"),   # epoch milliseconds; Greeks time, 0 if unknown
+    "symbol": np.dtype("<u4"),
+    "kind": np.dtype("u1"),          # QUOTE or GREEKS
+    "bid": np.dtype("<f8"),
+    "ask": np.dtype("<f8"),
+    "bid_size": np.dtype("<f8"),
+    "ask_size": np.dtype("<f8"),
+    "price": np.dtype("<f8"),
+    "delta": np.dtype("<f4"),
+    "gamma": np.dtype("<f4"),
+    "theta": np.dtype("<f4"),
+    "vega": np.dtype("<f4"),
+    "rho": np.dtype("<f4"),
+    "iv": np.dtype("<f4"),
+}
+# event attribute -> column
+QUOTE_COLUMNS = {"bid_price": "bid", "ask_price": "ask", "bid_size": "bid_size", "ask_size": "ask_size"}
+GREEKS_COLUMNS = {
+    "price": "price", "delta": "delta", "gamma": "gamma", "theta": "theta",
+    "vega": "vega", "rho": "rho", "volatility": "iv"
+}
+
+
+def archive_dir() -> str:
+    return os.getenv("TICK_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+
+
+def archive_path(underlying: str, trading_date: date, directory: Optional[str] = None) -> str:
+    return os.path.join(directory or archive_dir(), underlying, trading_date.isoformat())
+
+
+def _float(value: Any) -> float:
+    return np.nan if value is None else float(value)
+
+
+def tick_row(event: Any, received_at: float) -> Tuple[int, float, int, Dict[str, float]]:
+    """
+    :return: (kind, received_at, event time in ms, column values) for a Quote or Greeks event.
+    """
+    if hasattr(event, "volatility"):
+        return GREEKS, received_at, int(getattr(event, "time", 0) or 0), {
+            column: _float(getattr(event, field, None)) for field, column in GREEKS_COLUMNS.items()
+        }
+    return QUOTE, received_at, 0, {
+        column: _float(getattr(event, field, None)) for field, column in QUOTE_COLUMNS.items()
+    }
+
+
+class ColumnFiles:
+    """
+    Appends batches of ticks to the column files of one archive directory. Not
+    thread-safe; TickArchiveWriter only touches it from its writer thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.symbols = _read_symbols(path)
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        # a crash between column writes leaves ragged files; cut them back to the shortest
+        length = _archive_length(path)
+        for name, dtype in TICK_COLUMNS.items():
+            column_path = os.path.join(path, name + ".bin")
+            if os.path.exists(column_path) and os.path.getsize(column_path) != length * dtype.itemsize:
+                os.truncate(column_path, length * dtype.itemsize)
+        self._files = {name: open(os.path.join(path, name + ".bin"), "ab") for name in TICK_COLUMNS}
+        self._symbols_file = open(os.path.join(path, "symbols.txt"), "a")
+
+    def symbol_id(self, symbol: str) -> int:
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self._symbols_file.write(symbol + "\n")
+        return symbol_id
+
+    def append(self, ticks: List[Tuple[str, int, float, int, Dict[str, float]]]) -> None:
+        """
+        :param ticks: (symbol, kind, received_at, event_time, values) tuples.
+        """
+        columns = {
+            name: np.full(len(ticks), np.nan if dtype.kind == "f" else 0, dtype=dtype)
+            for name, dtype in TICK_COLUMNS.items()
+        }
+        for i, (symbol, kind, received_at, event_time, values) in enumerate(ticks):
+            columns["symbol"][i] = self.symbol_id(symbol)
+            columns["kind"][i] = kind
+            columns["received_at"][i] = received_at
+            columns["event_time"][i] = event_time
+            for name, value in values.items():
+                columns[name][i] = value
+        # symbol ids must be on disk before the rows that use them
+        self._symbols_file.flush()
+        for name, file in self._files.items():
+            columns[name].tofile(file)
+            file.flush()
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+        self._symbols_file.close()
+
+
+class TickArchiveWriter:
+    """
+    Archives streamed events from a background thread. append() only enqueues, so the
+    event loop never waits on the disk; the writer thread drains the queue in batches.
+
+    Example usage::
+
+        archive = TickArchiveWriter("SPX", today)
+        archive.append(greeks)
+        archive.close()
+    """
+
+    def __init__(self, underlying: str, trading_date: date, directory: Optional[str] = None,
+                 batch_size: int = 4096, flush_interval: float = 1.0):
+        self.path = archive_path(underlying, trading_date, directory)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._files = ColumnFiles(self.path)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="tick-archive", daemon=True)
+        self._thread.start()
+
+    def append(self, event: Any, received_at: Optional[float] = None) -> None:
+        if not self._closed:
+            self._queue.put((event, time.time() if received_at is None else received_at))
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                ticks = [(event.event_symbol, *tick_row(event, received_at)) for event, received_at in batch]
+                try:
+                    self._files.append(ticks)
+                    self.written += len(ticks)
+                except OSError as e:
+                    print(f"[DEBUG] Tick archive write failed: {e}")
+        self._files.close()
+
+    def close(self) -> None:
+        """
+        Writes everything queued so far and stops the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _read_symbols(path: str) -> List[str]:
+    try:
+        with open(os.path.join(path, "symbols.txt")) as file:
+            return file.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+def _archive_length(path: str) -> int:
+    lengths = []
+    for name, dtype in TICK_COLUMNS.items():
+        column_path = os.path.join(path, name + ".bin")
+        lengths.append(os.path.getsize(column_path) // dtype.itemsize if os.path.exists(column_path) else 0)
+    return min(lengths)
+
+
+class TickArchive:
+    """
+    Read-only, memory-mapped view of one archive directory. Columns are NumPy arrays
+    backed by the files, so nothing is parsed or copied until it is used.
+
+    Example usage::
+
+        ticks = TickArchive.open("SPX", date(2025, 4, 10))
+        greeks = ticks.kind == GREEKS
+        print(ticks.column("iv")[greeks].mean())
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.symbols = _read_symbols(path)
+        self.size = _archive_length(path)
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in TICK_COLUMNS.items():
+            if self.size:
+                self.columns[name] = np.memmap(
+                    os.path.join(path, name + ".bin"), dtype=dtype, mode="r", shape=(self.size,)
+                )
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    @classmethod
+    def open(cls, underlying: str, trading_date: date, directory: Optional[str] = None) -> "TickArchive":
+        return cls(archive_path(underlying, trading_date, directory))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def column(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @property
+    def kind(self) -> np.ndarray:
+        return self.columns["kind"]
+
+    def symbol_mask(self, symbol: str) -> np.ndarray:
+        """
+        :return: boolean mask of the ticks of one streamer symbol.
+        """
+        try:
+            symbol_id = self.symbols.index(symbol)
+        except ValueError:
+            return np.zeros(self.size, dtype=bool)
+        return self.columns["symbol"] == symbol_id
+
+
+def import_recording(path: str, directory: Optional[str] = None) -> Dict[Tuple[str, date], int]:
+    """
+    Converts a combined_data.json style recording into the archive, one directory per
+    underlying and trading date (taken from the event timestamps).
+    :return: number of ticks written per (underlying, date).
+    """
+    from replayFeed import load_recording
+
+    options, events = load_recording(path)
+    underlyings = {option.streamer_symbol: option.underlying_symbol for option in options}
+    grouped: Dict[Tuple[str, date], List[Tuple[str, int, float, int, Dict[str, float]]]] = {}
+    for received_at, event in events:
+        symbol = event.event_symbol
+        trading_date = datetime.fromtimestamp(received_at, tz=timezone.utc).date()
+        key = (underlyings.get(symbol, symbol), trading_date)
+        grouped.setdefault(key, []).append((symbol, *tick_row(event, received_at)))
+    for (underlying, trading_date), ticks in grouped.items():
+        files = ColumnFiles(archive_path(underlying, trading_date, directory))
+        files.append(ticks)
+        files.close()
+    return {key: len(ticks) for key, ticks in grouped.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tick archive tools.")
+    parser.add_argument("--dir", default=None, help="archive directory (default TICK_ARCHIVE_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="import a combined_data.json recording")
+    import_parser.add_argument("recording")
+    info_parser = commands.add_parser("info", help="summarize an archived day")
+    info_parser.add_argument("underlying")
+    info_parser.add_argument("date", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    if args.command == "import":
+        for (underlying, trading_date), count in import_recording(args.recording, args.dir).items():
+            print(f"{underlying} {trading_date}: {count} ticks -> {archive_path(underlying, trading_date, args.dir)}")
+    else:
+        ticks = TickArchive.open(args.underlying, args.date, args.dir)
+        size_mb = sum(column.nbytes for column in ticks.columns.values()) / 2 ** 20
+        print(f"{ticks.path}: {len(ticks)} ticks, {len(ticks.symbols)} symbols, "
+              f"{int(np.count_nonzero(ticks.kind == QUOTE))} quotes, "
+              f"{int(np.count_nonzero(ticks.kind == GREEKS))} greeks, {size_mb:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import math
 import time
 from main import *
 from tastytrade.order import NewOrder, OrderAction, OrderTimeInForce, OrderType
@@ -5,6 +6,9 @@ from http.client import HTTPException as HTTPError
 
 import asyncio
 
+# The `session` passed to the REST helpers below is a shared httpClient.TastyHttpClient;
+# paths are relative to its base URL (TASTY_API_URL).
+
 def calculate_iv_rank(current_iv, iv_history):
     iv_high = max(iv_history)
     iv_low = min(iv_history)
@@ -12,10 +16,26 @@ def calculate_iv_rank(current_iv, iv_history):
         return 0
     return ((current_iv - iv_low) / (iv_high - iv_low)) * 100
 
-async def get_option_quote(session, symbol, expiration, strike, option_type):
+async def get_option_quote(session, symbol, expiration, strike, option_type, state=None):
+        # Serve the quote from the live chain state when it is streaming this contract;
+        # anything it can't answer (another underlying, unknown contract, no quote) goes to REST
+        if state is not None and state.underlying_symbol == symbol:
+            row = state.find_contract(expiration, strike, option_type)
+            bid, ask = (math.nan, math.nan) if row is None else (state.columns['bid'][row], state.columns['ask'][row])
+            if not (math.isnan(bid) or math.isnan(ask)):
+                return {
+                    'symbol': state.symbols[row],
+                    'streamer-symbol': state.streamer_symbols[row],
+                    'expiration-date': expiration,
+                    'strike-price': strike,
+                    'option-type': option_type,
+                    'bid-price': float(bid),
+                    'ask-price': float(ask),
+                }
+
         # Fetch the latest quote for the option contract
         response = await session.get(
-            f'https://api.tastytrade.com/v1/marketdata/option-chains/{symbol}/options'
+            f'/marketdata/option-chains/{symbol}/options'
         )
         if response.status != 200:
             raise ValueError(f"Failed to fetch option quote: {response.status}")
@@ -34,11 +54,12 @@ async def get_option_quote(session, symbol, expiration, strike, option_type):
 
 
 async def smart_price_option_order(
-        session, symbol, expiration, strike, option_type, quantity, side, max_attempts=5, delay=2
+        session, symbol, expiration, strike, option_type, quantity, side, max_attempts=5, delay=2,
+        tracker=None, state=None
     ):
         for attempt in range(max_attempts):
             # Fetch current market data for the option
-            option_quote = await get_option_quote(session, symbol, expiration, strike, option_type)
+            option_quote = await get_option_quote(session, symbol, expiration, strike, option_type, state=state)
             mid_price = (option_quote['bid-price'] + option_quote['ask-price']) / 2
 
             # Adjust price based on attempt
@@ -52,7 +73,7 @@ async def smart_price_option_order(
             order = await place_limit_order(session, symbol, quantity, side, price, expiration, strike, option_type)
 
             # Wait for order to fill
-            filled = await wait_for_fill(session, order['id'], timeout=delay)
+            filled = await wait_for_fill(session, order['id'], timeout=delay, tracker=tracker)
             if filled:
                 return order
 
@@ -72,15 +93,19 @@ async def place_limit_order(session, symbol, quantity, side, price, expiration,
         'order_type': OrderType.LIMIT,
         'time_in_force': OrderTimeInForce.DAY
     }
-    response = await session.post('https://api.tastytrade.com/v1/orders', json=order)
+    response = await session.post('/orders', json=order)
     if response.status != 201:
         raise HTTPError(f"Failed to place order: {response.status}")
     return await response.json()
 
-async def wait_for_fill(session, order_id, timeout=60):
+async def wait_for_fill(session, order_id, timeout=60, tracker=None):
+    # With an OrderFillTracker the fill is pushed over the shared account stream
+    # instead of polled, so it resolves as soon as it happens.
+    if tracker is not None:
+        return await tracker.wait_for_fill(order_id, timeout=timeout)
     start_time = time.time()
     while True:
-        response = await session.get(f'https://api.tastytrade.com/v1/orders/{order_id}')
+        response = await session.get(f'/orders/{order_id}')
         if response.status != 200:
             raise HTTPError(f"Failed to fetch order status: {response.status}")
         order_status = await response.json()
@@ -102,8 +127,211 @@ async def place_market_order(session, symbol, quantity, side, expiration, strike
         'order_type': OrderType.MARKET,
         'time_in_force': OrderTimeInForce.DAY
     }
-    response = await session.post('https://api.tastytrade.com/v1/orders', json=order)
+    response = await session.post('/orders', json=order)
     if response.status != 201:
         raise HTTPError(f"Failed to place order: {response.status}")
     return await response.json()
 
+
+
+async def replace_limit_order(session, order_id, symbol, quantity, side, price, expiration, strike, option_type):
+    # Cancel/replace in one request so the old and new price are never both working
+    order = {
+        'symbol': symbol,
+        'quantity': quantity,
+        'side': side,
+        'price': price,
+        'expiration': expiration,
+        'strike': strike,
+        'option_type': option_type,
+        'order_type': OrderType.LIMIT,
+        'time_in_force': OrderTimeInForce.DAY
+    }
+    response = await session.put(f'/orders/{order_id}', json=order)
+    if response.status not in (200, 201):
+        raise HTTPError(f"Failed to replace order: {response.status}")
+    return await response.json()
+
+
+async def cancel_order(session, order_id):
+    response = await session.delete(f'/orders/{order_id}')
+    if response.status not in (200, 204):
+        raise HTTPError(f"Failed to cancel order: {response.status}")
+
+
+async def cancel_orders(session, order_ids):
+    # Cancel every order even if some of the requests fail; failures are only logged
+    results = await asyncio.gather(*[cancel_order(session, order_id) for order_id in order_ids], return_exceptions=True)
+    for order_id, result in zip(order_ids, results):
+        if isinstance(result, BaseException):
+            print(f"[DEBUG] Failed to cancel order {order_id}: {result}")
+
+
+async def order_filled(session, order_id):
+    response = await session.get(f'/orders/{order_id}')
+    if response.status != 200:
+        raise HTTPError(f"Failed to fetch order status: {response.status}")
+    order_status = await response.json()
+    return order_status['status'] == 'FILLED'
+
+
+async def place_complex_limit_order(session, legs, price, order_id=None):
+    # One order for every leg; price is the net price per spread (positive = debit)
+    order = {
+        'legs': [
+            {
+                'symbol': leg['symbol'],
+                'quantity': leg['quantity'],
+                'side': leg['side'],
+                'expiration': leg['expiration'],
+                'strike': leg['strike'],
+                'option_type': leg['option_type'],
+            }
+            for leg in legs
+        ],
+        'price': price,
+        'order_type': OrderType.LIMIT,
+        'time_in_force': OrderTimeInForce.DAY
+    }
+    if order_id is None:
+        response = await session.post('/orders', json=order)
+    else:
+        response = await session.put(f'/orders/{order_id}', json=order)
+    if response.status not in (200, 201):
+        raise HTTPError(f"Failed to place complex order: {response.status}")
+    return await response.json()
+
+
+def walk_price(quote, side, attempt, max_attempts):
+    # Start at mid and walk toward the far side of the spread on a shared schedule
+    mid_price = (quote['bid-price'] + quote['ask-price']) / 2
+    price_adjustment = (attempt / max_attempts) * (quote['ask-price'] - quote['bid-price'])
+    return mid_price + price_adjustment if side == 'buy' else mid_price - price_adjustment
+
+
+def new_leg_metrics():
+    return {
+        'attempts': 0,
+        'quote_ms': [],
+        'submit_ms': [],
+        'prices': [],
+        'filled': False,
+        'time_to_fill_ms': None,
+    }
+
+
+async def smart_price_multi_leg_order(
+        session, legs, max_attempts=5, delay=2, tracker=None, state=None, complex_order=False
+    ):
+    """
+    Works every leg of a spread at the same time. On each attempt all unfilled legs are
+    re-quoted and repriced concurrently from mid toward the far side, their working
+    orders are replaced in place, and the fills are awaited together. With
+    complex_order=True the legs are sent as a single net-priced order instead.
+    :param legs: list of dicts with symbol, expiration, strike, option_type, quantity, side.
+    :return: (orders by leg index, per-leg timing metrics; in complex mode every leg shares
+        the one order and its metrics). Orders still unfilled after the last attempt are cancelled.
+    """
+    if complex_order:
+        return await _smart_price_complex_order(session, legs, max_attempts, delay, tracker, state)
+
+    start = time.perf_counter()
+    orders = {}
+    metrics = [new_leg_metrics() for _ in legs]
+
+    def mark_filled(i):
+        metrics[i]['filled'] = True
+        metrics[i]['time_to_fill_ms'] = (time.perf_counter() - start) * 1000
+
+    async def work_leg(i, attempt):
+        leg = legs[i]
+        t0 = time.perf_counter()
+        quote = await get_option_quote(
+            session, leg['symbol'], leg['expiration'], leg['strike'], leg['option_type'], state=state
+        )
+        t1 = time.perf_counter()
+        price = walk_price(quote, leg['side'], attempt, max_attempts)
+        args = (leg['symbol'], leg['quantity'], leg['side'], price, leg['expiration'], leg['strike'], leg['option_type'])
+        if i in orders:
+            try:
+                orders[i] = await replace_limit_order(session, orders[i]['id'], *args)
+            except HTTPError:
+                # The leg may have filled after wait_leg gave up; a filled order can't be replaced
+                if not await order_filled(session, orders[i]['id']):
+                    raise
+                mark_filled(i)
+                return
+        else:
+            orders[i] = await place_limit_order(session, *args)
+        t2 = time.perf_counter()
+        metrics[i]['attempts'] += 1
+        metrics[i]['quote_ms'].append((t1 - t0) * 1000)
+        metrics[i]['submit_ms'].append((t2 - t1) * 1000)
+        metrics[i]['prices'].append(price)
+
+    async def wait_leg(i):
+        if await wait_for_fill(session, orders[i]['id'], timeout=delay, tracker=tracker):
+            mark_filled(i)
+
+    async def gather_legs(calls):
+        # Let every leg finish before raising, so no leg's order is left untracked
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    try:
+        for attempt in range(max_attempts):
+            pending = [i for i in range(len(legs)) if not metrics[i]['filled']]
+            if not pending:
+                break
+            await gather_legs([work_leg(i, attempt) for i in pending])
+            await gather_legs([wait_leg(i) for i in pending if not metrics[i]['filled']])
+    finally:
+        # On the last attempt or any failure, pull every order that is still working
+        unfilled = [i for i in orders if not metrics[i]['filled']]
+        await cancel_orders(session, [orders[i]['id'] for i in unfilled])
+    return orders, metrics
+
+
+async def _smart_price_complex_order(session, legs, max_attempts, delay, tracker, state):
+    start = time.perf_counter()
+    order = None
+    metrics = new_leg_metrics()
+
+    def mark_filled():
+        metrics['filled'] = True
+        metrics['time_to_fill_ms'] = (time.perf_counter() - start) * 1000
+
+    try:
+        for attempt in range(max_attempts):
+            t0 = time.perf_counter()
+            quotes = await asyncio.gather(*[
+                get_option_quote(session, leg['symbol'], leg['expiration'], leg['strike'], leg['option_type'], state=state)
+                for leg in legs
+            ])
+            t1 = time.perf_counter()
+            # Net debit: buys add, sells subtract, each leg walked toward its far side
+            price = sum(
+                (1 if leg['side'] == 'buy' else -1) * walk_price(quote, leg['side'], attempt, max_attempts)
+                for leg, quote in zip(legs, quotes)
+            )
+            try:
+                order = await place_complex_limit_order(session, legs, price, order_id=None if order is None else order['id'])
+            except HTTPError:
+                if order is None or not await order_filled(session, order['id']):
+                    raise
+                mark_filled()
+                break
+            t2 = time.perf_counter()
+            metrics['attempts'] += 1
+            metrics['quote_ms'].append((t1 - t0) * 1000)
+            metrics['submit_ms'].append((t2 - t1) * 1000)
+            metrics['prices'].append(price)
+            if await wait_for_fill(session, order['id'], timeout=delay, tracker=tracker):
+                mark_filled()
+                break
+    finally:
+        if order is not None and not metrics['filled']:
+            await cancel_orders(session, [order['id']])
+    return {i: order for i in range(len(legs))}, [metrics] * len(legs)